@@ -110,13 +110,11 @@ def main():
                 f"Frecuencia: {processor.low_freq}-{processor.high_freq} Hz"
             ]
             
-            y_offset = 30
-            for text in info_text:
-                combined = visualizer.draw_text(
-                    combined, text, (10, y_offset),
-                    font_scale=0.6, color=(0, 255, 0), bg_color=(0, 0, 0)
-                )
-                y_offset += 25
+            combined = visualizer.draw_text_batch(
+                combined,
+                [(text, (10, 30 + 25 * i)) for i, text in enumerate(info_text)],
+                font_scale=0.6, color=(0, 255, 0), bg_color=(0, 0, 0)
+            )
             
             # Mostrar
             cv2.imshow("Eulerian Magnification Demo", combined)
@@ -127,7 +127,7 @@ def main():
     # Estado
     prev_gray_roi = None
     stable_time = 0.0
-    last_t = time.time()
+    last_t = time.perf_counter_ns()
     locked = False
     lock_until = 0.0
     bpm_locked = None
@@ -141,9 +141,10 @@ def main():
         if not ok:
             break
 
-        now = time.time()
-        dt = max(1e-6, now - last_t)
-        last_t = now
+        now_ns = time.perf_counter_ns()
+        dt = max(1e-6, (now_ns - last_t) / 1e9)
+        last_t = now_ns
+        now = now_ns / 1e9
 
         frame = cv2.flip(frame, 1)
         frame_f32 = (frame.astype(np.float32) / 255.0)
@@ -44,6 +44,9 @@ setup(
         "viz": [
             "matplotlib>=3.7.0",
         ],
+        "jit": [
+            "numba>=0.58.0",
+        ],
     },
     entry_points={
         "console_scripts": [
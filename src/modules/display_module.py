@@ -63,7 +63,7 @@ class DisplayModule(BaseDevice):
         
         # Para cálculo de FPS
         import time
-        self.last_time = time.time()
+        self.last_time = time.perf_counter_ns()
         self.fps_buffer = []
     
     def initialize(self) -> bool:
@@ -219,8 +219,8 @@ class DisplayModule(BaseDevice):
     def _update_fps(self) -> None:
         """Actualiza el cálculo de FPS."""
         import time
-        current_time = time.time()
-        elapsed = current_time - self.last_time
+        current_time = time.perf_counter_ns()
+        elapsed = (current_time - self.last_time) / 1e9
         
         if elapsed > 0:
             fps = 1.0 / elapsed
@@ -13,8 +13,13 @@ Implementación completa con:
 
 import cv2
 import numpy as np
-from collections import deque
-from typing import Any, Dict, Optional
+from scipy import fft
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+import os
+import queue
+import threading
 import time
 
 import sys
@@ -22,6 +27,70 @@ sys.path.append('src')
 
 from core.base_device import BaseDevice
 
+# Una única implementación pública (IIR en tiempo real)
+__all__ = ["EulerianProcessorModule"]
+
+# Numba es opcional: acelera el paso del IIR si está instalado
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _iir_bandpass_step(x, lp, hp, a_low, b_low, a_high, b_high,
+                           gain, out):
+        """Actualiza lp/hp y escribe gain*(lp - hp) en una sola pasada (1D)."""
+        for i in range(x.size):
+            lp[i] = a_high * lp[i] + b_high * x[i]
+            hp[i] = a_low * hp[i] + b_low * x[i]
+            out[i] = gain * (lp[i] - hp[i])
+
+    @njit(inline='always')
+    def _reflect101(i, n):
+        if i < 0:
+            return -i
+        if i >= n:
+            return 2 * n - 2 - i
+        return i
+
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _pyrdown_gauss_f32c3(src, dst):
+        """pyrDown (kernel 5x5 [1 4 6 4 1]/16 separable, stride 2) en float32.
+
+        Borde BORDER_REFLECT_101 como cv2.pyrDown. Por cada fila de salida:
+        pasada vertical sobre la fila completa y luego horizontal decimada.
+        """
+        H, W, C = src.shape
+        oh, ow = dst.shape[0], dst.shape[1]
+        s2 = src.reshape(H, W * C)
+        d2 = dst.reshape(oh, ow * C)
+        for oy in prange(oh):
+            row = np.empty(W * C, np.float32)
+            cy = 2 * oy
+            r0 = s2[_reflect101(cy - 2, H)]
+            r1 = s2[_reflect101(cy - 1, H)]
+            r2 = s2[cy]
+            r3 = s2[_reflect101(cy + 1, H)]
+            r4 = s2[_reflect101(cy + 2, H)]
+            for i in range(W * C):
+                row[i] = r0[i] + r4[i] + 4.0 * (r1[i] + r3[i]) + 6.0 * r2[i]
+            out = d2[oy]
+            for ox in range(ow):
+                cx = 2 * ox
+                x0 = _reflect101(cx - 2, W) * C
+                x1 = _reflect101(cx - 1, W) * C
+                x2 = cx * C
+                x3 = _reflect101(cx + 1, W) * C
+                x4 = _reflect101(cx + 2, W) * C
+                o = ox * C
+                for c in range(C):
+                    out[o + c] = (row[x0 + c] + row[x4 + c]
+                                  + 4.0 * (row[x1 + c] + row[x3 + c])
+                                  + 6.0 * row[x2 + c]) * (1.0 / 256.0)
+
 
 class _TemporalIIRBandpass:
     """Filtro IIR pasa-banda temporal de dos polos.
@@ -30,42 +99,187 @@ class _TemporalIIRBandpass:
     def __init__(self, fmin: float, fmax: float, fps: float):
         self.a_low = np.exp(-2.0 * np.pi * fmin / fps)   # high-pass
         self.a_high = np.exp(-2.0 * np.pi * fmax / fps)  # low-pass
+        self.one_minus_a_low = 1.0 - self.a_low
+        self.one_minus_a_high = 1.0 - self.a_high
         self.lp: Optional[np.ndarray] = None
         self.hp: Optional[np.ndarray] = None
+        self.out: Optional[np.ndarray] = None
 
     def apply(self, x: np.ndarray) -> np.ndarray:
-        x = x.astype(np.float32, copy=False)
-        if self.lp is None:
+        """Devuelve la banda lp - hp (buffer reutilizado entre frames)."""
+        return self.apply_amplified(x, 1.0)
+
+    def apply_amplified(self, x: np.ndarray, alpha: float) -> np.ndarray:
+        """Como ``apply`` pero devuelve ya ``alpha * (lp - hp)``."""
+        # Invariante: la pirámide se construye sobre float32
+        assert x.dtype == np.float32, x.dtype
+        if self.lp is None or self.lp.shape != x.shape:
             self.lp = x.copy()
             self.hp = x.copy()
-        self.lp = self.a_high * self.lp + (1.0 - self.a_high) * x
-        self.hp = self.a_low * self.hp + (1.0 - self.a_low) * x
-        return self.lp - self.hp
+            self.out = np.empty_like(x)
+        if NUMBA_AVAILABLE and x.flags.c_contiguous:
+            _iir_bandpass_step(
+                x.ravel(), self.lp.ravel(), self.hp.ravel(),
+                np.float32(self.a_low), np.float32(self.one_minus_a_low),
+                np.float32(self.a_high), np.float32(self.one_minus_a_high),
+                np.float32(alpha), self.out.ravel(),
+            )
+            return self.out
+        cv2.addWeighted(self.lp, self.a_high, x, self.one_minus_a_high, 0.0,
+                        dst=self.lp)
+        cv2.addWeighted(self.hp, self.a_low, x, self.one_minus_a_low, 0.0,
+                        dst=self.hp)
+        cv2.addWeighted(self.lp, alpha, self.hp, -alpha, 0.0, dst=self.out)
+        return self.out
 
     def reset(self):
         self.lp = None
         self.hp = None
+        self.out = None
 
 
-def _build_gaussian_pyramid(frame: np.ndarray, levels: int) -> list:
-    """Construye pirámide gaussiana."""
+def _pyr_down(src: np.ndarray, use_numba: bool = False) -> np.ndarray:
+    """pyrDown con kernel Numba opcional para float32 de 3 canales."""
+    H, W = src.shape[:2]
+    if (use_numba and NUMBA_AVAILABLE and src.dtype == np.float32
+            and src.ndim == 3 and src.shape[2] == 3
+            and H >= 3 and W >= 3 and src.flags.c_contiguous):
+        dst = np.empty(((H + 1) // 2, (W + 1) // 2, 3), dtype=np.float32)
+        _pyrdown_gauss_f32c3(src, dst)
+        return dst
+    return cv2.pyrDown(src)
+
+
+def _build_gaussian_pyramid(frame: np.ndarray, levels: int,
+                            use_numba: bool = False) -> list:
+    """Construye pirámide gaussiana (se asume ``frame`` en float32)."""
     pyr = [frame]
     for _ in range(levels):
-        pyr.append(cv2.pyrDown(pyr[-1]))
+        pyr.append(_pyr_down(pyr[-1], use_numba))
     return pyr
 
 
 def _central_roi(frame: np.ndarray, frac_w: float = 0.35,
-                 frac_h: float = 0.35):
-    """Calcula ROI central del frame."""
+                 frac_h: float = 0.35, levels: int = 0):
+    """Calcula ROI central del frame.
+
+    ``w`` y ``h`` se redondean a múltiplos de ``2**levels`` para que
+    pyrDown/pyrUp recorran tamaños pares en todos los niveles. En frames
+    menores que ``2**levels`` el llamador recorta el ROI al frame y deja de
+    ser múltiplo (``_evm_cpu`` reconstruye entonces con ``dstsize``).
+    """
     H, W = frame.shape[:2]
-    w = int(W * frac_w)
-    h = int(H * frac_h)
+    q = 1 << levels
+    w = max(q, int(W * frac_w) // q * q)
+    h = max(q, int(H * frac_h) // q * q)
     x = (W - w) // 2
     y = (H - h) // 2
     return x, y, w, h
 
 
+# Matriz BGR -> YCrCb (ITU-R BT.601), filas: Y, Cr, Cb
+_BGR2YCRCB = np.array([
+    [0.114, 0.587, 0.299],
+    [-0.114 * 0.713, -0.587 * 0.713, (1.0 - 0.299) * 0.713],
+    [(1.0 - 0.114) * 0.564, -0.587 * 0.564, -0.299 * 0.564],
+], dtype=np.float64)
+
+
+# Pesos de luma BT.601 para BGR (equivalente a COLOR_BGR2GRAY)
+_BGR2GRAY = np.array([[0.114, 0.587, 0.299]], dtype=np.float32)
+
+
+def _chroma_attenuation_matrix(atten: float) -> np.ndarray:
+    """Matriz 3x3 que atenúa croma directamente en BGR.
+
+    Equivale a BGR->YCrCb, escalar Cr/Cb por ``atten`` y volver a BGR,
+    pero en una sola pasada con ``cv2.transform``.
+    """
+    m = (np.linalg.inv(_BGR2YCRCB)
+         @ np.diag([1.0, atten, atten])
+         @ _BGR2YCRCB)
+    return m.astype(np.float32)
+
+
+class _StagePipeline:
+    """Pipeline por etapas: un hilo por etapa unido por colas acotadas.
+
+    La etapa i del frame t corre en paralelo con la etapa i+1 del frame
+    t-1. Cada etapa procesa sus frames en orden, así que el estado de una
+    etapa (p. ej. el IIR) sólo lo toca su propio hilo.
+    """
+
+    _STOP = object()
+
+    def __init__(self, stages: list, depth: int, logger):
+        self.logger = logger
+        # Colas acotadas entre etapas; la de salida la vacía poll()
+        self._queues = [queue.Queue(maxsize=depth) for _ in stages]
+        self._queues.append(queue.Queue())
+        ncpu = os.cpu_count() or 1
+        self._threads = []
+        for i, fn in enumerate(stages):
+            t = threading.Thread(
+                target=self._worker,
+                args=(fn, self._queues[i], self._queues[i + 1], i % ncpu),
+                name=f"evm-stage-{i}", daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+
+    def _worker(self, fn, q_in: queue.Queue, q_out: queue.Queue, cpu: int):
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, {cpu})
+            except OSError:
+                pass
+        while True:
+            item = q_in.get()
+            if item is self._STOP:
+                q_out.put(item)
+                return
+            try:
+                q_out.put(fn(item))
+            except Exception as e:
+                self.logger.error(f"Error en etapa {fn.__name__}: {e}")
+
+    def submit(self, item: Any) -> None:
+        """Encola un frame (bloquea si la primera etapa va atrasada)."""
+        self._queues[0].put(item)
+
+    def poll(self) -> Optional[Any]:
+        """Devuelve el resultado más reciente disponible, o None."""
+        result = None
+        q_out = self._queues[-1]
+        while True:
+            try:
+                item = q_out.get_nowait()
+            except queue.Empty:
+                return result
+            if item is not self._STOP:
+                result = item
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._queues[0].put(self._STOP)
+        for t in self._threads:
+            t.join(timeout)
+
+
+# Por debajo de este lado de ROI la copia host<->OpenCL domina
+_OCL_MIN_ROI = 128
+
+
+def _cuda_available() -> bool:
+    """True si OpenCV tiene CUDA (con los módulos contrib) y un dispositivo."""
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() <= 0:
+            return False
+    except (AttributeError, cv2.error):
+        return False
+    return all(hasattr(cv2.cuda, fn)
+               for fn in ("pyrDown", "pyrUp", "addWeighted"))
+
+
 class EulerianProcessorModule(BaseDevice):
     """
     Módulo de magnificación euleriana de video (tiempo real) con
@@ -85,6 +299,19 @@ class EulerianProcessorModule(BaseDevice):
         self.pyramid_levels = config.get("pyramid_levels", 4)
         self.fps = config.get("fps", 30)
         self.chrom_atten = config.get("chrom_atten", 0.7)
+        # pyrDown propio en Numba (útil con varios núcleos; por defecto cv2)
+        self.numba_pyrdown = config.get("numba_pyrdown", False)
+        # Ejecutar la cadena EVM en GPU si OpenCV tiene CUDA
+        self.use_gpu = config.get("use_gpu", True)
+        # Sin CUDA: API transparente de OpenCV (UMat/OpenCL) si hay dispositivo
+        self.use_opencl = config.get("use_opencl", True)
+        # Pipeline por etapas en hilos (más throughput, más latencia)
+        self.pipelined = config.get("pipelined", False)
+        self.pipeline_depth = config.get("pipeline_depth", 2)
+        # Solapar la atenuación de croma (cv2 libera el GIL) con el BPM en
+        # otro hilo; opcional: el traspaso por frame puede costar más que
+        # el solape con ROIs pequeños
+        self.threaded_chroma = config.get("threaded_chroma", False)
 
         # --- ROI ---
         self.roi_frac_w = config.get("roi_frac_w", 0.35)
@@ -97,13 +324,42 @@ class EulerianProcessorModule(BaseDevice):
         self.ema_beta = config.get("ema", 0.7)
         self.window_secs = config.get("window_secs", 12)
         self.flip_horizontal = config.get("flip_horizontal", True)
+        # Con la lectura bloqueada no se amplifica el ROI; el IIR se
+        # mantiene caliente actualizándolo cada N frames
+        self.skip_evm_when_locked = config.get("skip_evm_when_locked", True)
+        self.locked_warm_every = config.get("locked_warm_every", 5)
 
         # --- Estado interno (se inicializa en initialize) ---
         self.temporal_filter: Optional[_TemporalIIRBandpass] = None
-        self.window: Optional[deque] = None
+        self._chroma_M: Optional[np.ndarray] = None
+        self._use_cuda = False
+        self._cuda_stream = None
+        self._use_ocl = False
+        self._ocl_size: Optional[Tuple[int, int]] = None
+        self._pipeline: Optional[_StagePipeline] = None
+        self._last_vis: Optional[np.ndarray] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lp_gpu = None
+        self._hp_gpu = None
+        self._lp_ocl = None
+        self._hp_ocl = None
+        # IIR escalar sobre la media de G (señal para BPM)
+        self._g_lp: Optional[float] = None
+        self._g_hp: Optional[float] = None
+        # Ventana BPM: buffer circular + suma acumulada para la media
+        self._ring: Optional[np.ndarray] = None
+        self._ring_idx = 0
+        self._ring_count = 0
+        self._ring_sum = 0.0
+        self._fft_in: Optional[np.ndarray] = None
+        self._mask_idx: Optional[np.ndarray] = None
+        self._mask_freqs: Optional[np.ndarray] = None
         self.prev_gray_roi: Optional[np.ndarray] = None
+        self._roi_cache: Optional[tuple] = None
+        # Textos estáticos prerenderizados: (color*alpha, 255-alpha, dy, dx)
+        self._sprite_cache: Dict[tuple, Tuple[np.ndarray, ...]] = {}
         self.stable_time = 0.0
-        self.last_t = 0.0
+        self.last_t = 0  # perf_counter_ns del frame anterior
         self.locked = False
         self.lock_until = 0.0
         self.bpm_locked: Optional[int] = None
@@ -136,8 +392,25 @@ class EulerianProcessorModule(BaseDevice):
             self.temporal_filter = _TemporalIIRBandpass(
                 self.low_freq, self.high_freq, self.fps
             )
-            self.window = deque(maxlen=int(self.window_secs * self.fps))
-            self.last_t = time.time()
+            n = int(self.window_secs * self.fps)
+            self._ring = np.zeros(n, dtype=np.float32)
+            self._ring_idx = 0
+            self._ring_count = 0
+            self._ring_sum = 0.0
+            self._fft_in = np.empty(n, dtype=np.float32)
+            self._update_freq_mask()
+            self._use_cuda = self.use_gpu and _cuda_available()
+            if self._use_cuda:
+                self._cuda_stream = cv2.cuda_Stream()
+                self.logger.info("EVM en GPU (cv2.cuda)")
+            elif self.use_opencl and cv2.ocl.haveOpenCL():
+                cv2.ocl.setUseOpenCL(True)
+                self._use_ocl = cv2.ocl.useOpenCL()
+                if self._use_ocl:
+                    self.logger.info("EVM en OpenCL (cv2.UMat)")
+            if self.chrom_atten < 1.0:
+                self._chroma_M = _chroma_attenuation_matrix(self.chrom_atten)
+            self.last_t = time.perf_counter_ns()
 
             return True
         except Exception as e:
@@ -145,10 +418,28 @@ class EulerianProcessorModule(BaseDevice):
             return False
 
     def start(self) -> bool:
+        if self.pipelined and self._pipeline is None:
+            self._pipeline = _StagePipeline(
+                [self._stage_prepare, self._stage_evm, self._stage_compose],
+                self.pipeline_depth, self.logger,
+            )
+            self.logger.info(
+                f"Pipeline por etapas activo (profundidad={self.pipeline_depth})"
+            )
+        elif (self.threaded_chroma and self._chroma_M is not None
+              and self._pool is None):
+            self._pool = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="evm-chroma")
         self.logger.info("Procesador euleriano iniciado")
         return True
 
     def stop(self) -> bool:
+        if self._pipeline is not None:
+            self._pipeline.stop()
+            self._pipeline = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
         self.logger.info("Procesador euleriano detenido")
         return True
 
@@ -159,104 +450,311 @@ class EulerianProcessorModule(BaseDevice):
         """Procesa un frame: EVM en ROI + BPM + overlays.
 
         Devuelve el frame uint8 listo para mostrar (con todos los overlays).
+        En modo ``pipelined`` devuelve el último frame completado por el
+        pipeline por etapas (con ``pipeline_depth`` frames de latencia).
         """
         if data is None:
             return None
 
+        if self._pipeline is not None:
+            self._pipeline.submit(data)
+            vis = self._pipeline.poll()
+            if vis is not None:
+                self._last_vis = vis
+            return self._last_vis
+
         try:
-            self.frame_count += 1
-            now = time.time()
-            dt = max(1e-6, now - self.last_t)
-            self.last_t = now
-
-            # Flip horizontal (espejo) como prueba.py
-            frame = cv2.flip(data, 1) if self.flip_horizontal else data.copy()
-            frame_f32 = frame.astype(np.float32) / 255.0
-            H, W = frame.shape[:2]
-
-            # ---- ROI central ----
-            x, y, w, h = _central_roi(frame_f32, self.roi_frac_w, self.roi_frac_h)
+            ctx = self._stage_prepare(data)
+            ctx = self._stage_evm(ctx)
+            return self._stage_compose(ctx)
+
+        except Exception as e:
+            self.logger.error(f"Error al procesar frame: {e}")
+            return data
+
+    def _stage_prepare(self, data: np.ndarray) -> Dict[str, Any]:
+        """Etapa 1: reloj, flip, normalización, ROI y pirámide (sin estado)."""
+        self.frame_count += 1
+        # Reloj monotónico en ns enteros; a segundos sólo para dt y bloqueo
+        now_ns = time.perf_counter_ns()
+        dt = max(1e-6, (now_ns - self.last_t) / 1e9)
+        self.last_t = now_ns
+        now = now_ns / 1e9
+
+        # Flip horizontal (espejo) como prueba.py
+        frame = cv2.flip(data, 1) if self.flip_horizontal else data.copy()
+        H, W = frame.shape[:2]
+        skip = self.skip_evm_when_locked and self.locked
+
+        # ---- ROI central (cacheado mientras no cambie la resolución) ----
+        key = (H, W, self.roi_frac_w, self.roi_frac_h, self.pyramid_levels)
+        if self._roi_cache is None or self._roi_cache[0] != key:
+            x, y, w, h = _central_roi(frame, self.roi_frac_w,
+                                      self.roi_frac_h, self.pyramid_levels)
             x = max(0, x)
             y = max(0, y)
             w = min(W - x, w)
             h = min(H - y, h)
-            crop = frame_f32[y:y+h, x:x+w]
+            self._roi_cache = (key, (x, y, w, h))
+        x, y, w, h = self._roi_cache[1]
+
+        # Sólo el ROI pasa a float32 [0,1]; el resto del frame sigue en uint8
+        crop = frame[y:y+h, x:x+w].astype(np.float32) * np.float32(1.0 / 255.0)
+
+        pyr = None
+        if not skip and not (self._use_cuda or self._use_ocl):
+            pyr = _build_gaussian_pyramid(
+                crop, self.pyramid_levels, self.numba_pyrdown
+            )
+
+        return {"now": now, "dt": dt, "frame": frame, "roi": (x, y, w, h),
+                "crop": crop, "pyr": pyr, "skip": skip}
 
-            # ---- Detección de movimiento en ROI ----
-            gray = cv2.cvtColor(
-                (crop * 255.0).astype(np.uint8), cv2.COLOR_BGR2GRAY
+    def _stage_evm(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """Etapa 2 (con estado): IIR, reconstrucción, movimiento y BPM."""
+        crop = ctx["crop"]
+        if ctx["skip"]:
+            return self._stage_evm_locked(ctx)
+
+        # ---- EVM en ROI (pirámide, IIR en la cima, reconstrucción) ----
+        src, small, up = self._run_evm(crop, ctx["pyr"])
+        g_band = self._bandpass_green_mean(small)
+
+        # ---- Detección de movimiento en ROI ----
+        self._update_motion(src)
+
+        ctx["magnified_crop"] = np.clip(crop + up, 0.0, 1.0)
+        if self._pool is not None and self._chroma_M is not None:
+            # La croma corre en otro hilo mientras se actualiza el BPM
+            ctx["chroma"] = self._pool.submit(
+                self._attenuate_chroma, ctx["magnified_crop"]
             )
-            gray = cv2.GaussianBlur(gray, (5, 5), 0)
-            self.motion = 0.0
-            if self.prev_gray_roi is not None:
-                diff = cv2.absdiff(gray, self.prev_gray_roi)
-                self.motion = float(np.mean(diff)) / 255.0
-            self.prev_gray_roi = gray
-            self.is_stable = self.motion < self.motion_thresh
-
-            # ---- EVM en ROI ----
-            pyr = _build_gaussian_pyramid(crop, self.pyramid_levels)
-            small = pyr[-1].astype(np.float32, copy=False)
-            band = self.temporal_filter.apply(small).astype(np.float32, copy=False)
-            amplified = (band * self.amplification_factor).astype(np.float32, copy=False)
-
-            up = amplified
-            for lvl in range(self.pyramid_levels):
+
+        # ---- Lógica BPM / estabilización ----
+        self._update_bpm(g_band, ctx["dt"], ctx["now"])
+        ctx["state"] = self._state_snapshot()
+        return ctx
+
+    def _stage_evm_locked(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """Etapa 2 con la lectura bloqueada: sin reconstrucción ni croma.
+
+        Se sigue midiendo movimiento (color del recuadro) y, cada
+        ``locked_warm_every`` frames, se corre el EVM completo descartando
+        la salida para que el IIR no arranque en frío al desbloquear.
+        """
+        crop = ctx["crop"]
+        warm = self.locked_warm_every
+        if warm and self.frame_count % warm == 0:
+            src, small, _ = self._run_evm(crop)
+            self._bandpass_green_mean(small)
+        else:
+            src = cv2.pyrDown(crop) if self.pyramid_levels > 0 else crop
+        self._update_motion(src)
+
+        ctx["magnified_crop"] = None
+        # Con lock activo el BPM no consume la señal; sólo expira el lock
+        self._update_bpm(0.0, ctx["dt"], ctx["now"])
+        ctx["state"] = self._state_snapshot()
+        return ctx
+
+    def _update_motion(self, src: np.ndarray) -> None:
+        """Actualiza ``motion``/``is_stable`` a partir del nivel 1 del ROI.
+
+        pyr[1] ya está suavizado por pyrDown: 1/4 de píxeles y sin
+        GaussianBlur. Luma BT.601 en float, sin pasar por uint8.
+        """
+        gray = cv2.transform(src, _BGR2GRAY)
+        self.motion = 0.0
+        if self.prev_gray_roi is not None:
+            diff = cv2.absdiff(gray, self.prev_gray_roi)
+            self.motion = cv2.mean(diff)[0]
+        self.prev_gray_roi = gray
+        self.is_stable = self.motion < self.motion_thresh
+
+    def _state_snapshot(self) -> SimpleNamespace:
+        """Copia del estado BPM/estabilidad para la etapa de overlays."""
+        return SimpleNamespace(
+            is_stable=self.is_stable, locked=self.locked,
+            stable_time=self.stable_time, lock_until=self.lock_until,
+            bpm_locked=self.bpm_locked, bpm_smooth=self.bpm_smooth,
+            motion=self.motion,
+        )
+
+    def _stage_compose(self, ctx: Dict[str, Any]) -> np.ndarray:
+        """Etapa 3: croma, ensamblado del frame de salida y overlays."""
+        x, y, w, h = ctx["roi"]
+        # El frame (uint8) ya es una copia propia: se dibuja sobre él
+        vis = ctx["frame"]
+        if ctx["magnified_crop"] is not None:
+            chroma = ctx.get("chroma")
+            if chroma is not None:
+                magnified_crop = chroma.result()
+            else:
+                magnified_crop = self._attenuate_chroma(ctx["magnified_crop"])
+            # magnified_crop ya está recortado a [0,1]
+            np.multiply(magnified_crop, 255.0, out=magnified_crop)
+            vis[y:y+h, x:x+w] = magnified_crop
+
+        # ---- Overlays ----
+        vis = self._draw_overlays(vis, x, y, w, h, ctx["now"], ctx["state"])
+
+        self.processed_frames += 1
+        return vis
+
+    def _attenuate_chroma(self, magnified_crop: np.ndarray) -> np.ndarray:
+        """Atenúa croma con la matriz BGR precalculada (si aplica)."""
+        if self._chroma_M is None:
+            return magnified_crop
+        magnified_crop = cv2.transform(magnified_crop, self._chroma_M)
+        np.clip(magnified_crop, 0.0, 1.0, out=magnified_crop)
+        return magnified_crop
+
+    def _run_evm(self, crop: np.ndarray, pyr: Optional[list] = None):
+        """Despacha la cadena EVM al backend activo (CUDA, OpenCL o CPU)."""
+        # Un ROI más pequeño que 2**levels (frames diminutos) no es múltiplo
+        # de ese bloque: sólo la CPU reconstruye con dstsize
+        if (crop.shape[0] | crop.shape[1]) & ((1 << self.pyramid_levels) - 1):
+            return self._evm_cpu(crop, pyr)
+        if self._use_cuda:
+            return self._evm_cuda(crop)
+        if self._use_ocl and min(crop.shape[:2]) >= _OCL_MIN_ROI:
+            return self._evm_ocl(crop)
+        return self._evm_cpu(crop, pyr)
+
+    def _evm_cpu(self, crop: np.ndarray, pyr: Optional[list] = None):
+        """EVM en CPU. Devuelve (fuente de movimiento, cima, señal ampliada)."""
+        if pyr is None:
+            pyr = _build_gaussian_pyramid(
+                crop, self.pyramid_levels, self.numba_pyrdown
+            )
+        small = pyr[-1]
+        up = self.temporal_filter.apply_amplified(
+            small, self.amplification_factor
+        )
+        levels = self.pyramid_levels
+        if (crop.shape[0] | crop.shape[1]) & ((1 << levels) - 1):
+            # ROI recortado al frame (< 2**levels px): tamaños impares
+            for lvl in range(levels):
                 up = cv2.pyrUp(
                     up, dstsize=(pyr[-2 - lvl].shape[1], pyr[-2 - lvl].shape[0])
                 )
+        else:
+            # El ROI es múltiplo de 2**levels: pyrUp recupera cada tamaño exacto
+            for _ in range(levels):
+                up = cv2.pyrUp(up)
 
-            magnified_crop = np.clip(crop + up, 0.0, 1.0)
+        src = pyr[1] if levels > 0 else crop
+        return src, small, up
 
-            # Atenuar croma
-            if self.chrom_atten < 1.0:
-                tmp = (magnified_crop * 255.0).astype(np.float32, copy=False)
-                yC, crC, cbC = cv2.split(
-                    cv2.cvtColor(tmp, cv2.COLOR_BGR2YCrCb)
-                )
-                crC *= self.chrom_atten
-                cbC *= self.chrom_atten
-                tmp = cv2.cvtColor(
-                    cv2.merge([yC, crC, cbC]), cv2.COLOR_YCrCb2BGR
-                )
-                magnified_crop = np.clip(tmp / 255.0, 0.0, 1.0)
+    def _evm_cuda(self, crop: np.ndarray):
+        """Misma cadena EVM en GPU (cv2.cuda) sobre un único stream.
 
-            # Ensamblar frame de salida
-            out = frame_f32.copy()
-            out[y:y+h, x:x+w] = magnified_crop
-            vis = (np.clip(out, 0.0, 1.0) * 255.0).astype(np.uint8)
+        El estado lp/hp del IIR vive en GpuMat; sólo se descargan pyr[1]
+        (movimiento), la cima (BPM) y la señal ampliada.
+        """
+        stream = self._cuda_stream
+        levels = self.pyramid_levels
+        gpu = cv2.cuda_GpuMat()
+        gpu.upload(crop, stream)
+        pyr = [gpu]
+        for _ in range(levels):
+            pyr.append(cv2.cuda.pyrDown(pyr[-1], stream=stream))
+        small = pyr[-1]
+
+        tf = self.temporal_filter
+        if self._lp_gpu is None or self._lp_gpu.size() != small.size():
+            self._lp_gpu = small.clone()
+            self._hp_gpu = small.clone()
+        self._lp_gpu = cv2.cuda.addWeighted(
+            self._lp_gpu, tf.a_high, small, tf.one_minus_a_high, 0.0,
+            stream=stream
+        )
+        self._hp_gpu = cv2.cuda.addWeighted(
+            self._hp_gpu, tf.a_low, small, tf.one_minus_a_low, 0.0,
+            stream=stream
+        )
+        alpha = float(self.amplification_factor)
+        up = cv2.cuda.addWeighted(
+            self._lp_gpu, alpha, self._hp_gpu, -alpha, 0.0, stream=stream
+        )
+        for _ in range(levels):
+            up = cv2.cuda.pyrUp(up, stream=stream)
 
-            # ---- Lógica BPM / estabilización ----
-            self._update_bpm(band, dt, now)
+        src = pyr[1].download(stream) if levels > 0 else crop
+        small_host = small.download(stream)
+        up_host = up.download(stream)
+        stream.waitForCompletion()
+        return src, small_host, up_host
 
-            # ---- Overlays ----
-            vis = self._draw_overlays(vis, x, y, w, h, now)
+    def _evm_ocl(self, crop: np.ndarray):
+        """Cadena EVM sobre UMat: OpenCV la envía al dispositivo OpenCL.
 
-            self.processed_frames += 1
-            return vis
+        Misma estructura que ``_evm_cuda``; el estado lp/hp del IIR se
+        queda en UMat entre frames.
+        """
+        levels = self.pyramid_levels
+        top = (crop.shape[1] >> levels, crop.shape[0] >> levels)
+        pyr = [cv2.UMat(crop)]
+        for _ in range(levels):
+            pyr.append(cv2.pyrDown(pyr[-1]))
+        small = pyr[-1]
+
+        tf = self.temporal_filter
+        if self._lp_ocl is None or self._ocl_size != top:
+            self._lp_ocl = small
+            self._hp_ocl = small
+            self._ocl_size = top
+        self._lp_ocl = cv2.addWeighted(
+            self._lp_ocl, tf.a_high, small, tf.one_minus_a_high, 0.0
+        )
+        self._hp_ocl = cv2.addWeighted(
+            self._hp_ocl, tf.a_low, small, tf.one_minus_a_low, 0.0
+        )
+        alpha = float(self.amplification_factor)
+        up = cv2.addWeighted(self._lp_ocl, alpha, self._hp_ocl, -alpha, 0.0)
+        for _ in range(levels):
+            up = cv2.pyrUp(up)
 
-        except Exception as e:
-            self.logger.error(f"Error al procesar frame: {e}")
-            return data
+        src = pyr[1].get() if levels > 0 else crop
+        return src, small.get(), up.get()
 
     # ------------------------------------------------------------------
     # BPM
     # ------------------------------------------------------------------
-    def _update_bpm(self, band: np.ndarray, dt: float, now: float):
+    def _bandpass_green_mean(self, small: np.ndarray) -> float:
+        """Filtra con el mismo IIR la media del canal G de la pirámide.
+
+        Al ser el filtro lineal, equivale a ``mean(band[..., 1])`` pero
+        sin recorrer la banda filtrada píxel a píxel.
+        """
+        g = cv2.mean(small)[1]
+        tf = self.temporal_filter
+        if self._g_lp is None:
+            self._g_lp = g
+            self._g_hp = g
+        self._g_lp = tf.a_high * self._g_lp + tf.one_minus_a_high * g
+        self._g_hp = tf.a_low * self._g_hp + tf.one_minus_a_low * g
+        return self._g_lp - self._g_hp
+
+    def _update_bpm(self, gmean: float, dt: float, now: float):
         """Calcula BPM con FFT y lógica de estabilización/lock."""
         if self.is_stable and not self.locked:
-            gmean = float(np.mean(band[..., 1]))
-            self.window.append(gmean)
-
-            if len(self.window) == self.window.maxlen:
-                sig = np.asarray(self.window, dtype=np.float32)
-                sig -= sig.mean()
-                fft = np.fft.rfft(sig)
-                freqs = np.fft.rfftfreq(len(sig), d=1.0 / self.fps)
-                mask = (freqs >= self.low_freq) & (freqs <= self.high_freq)
-                if np.any(mask):
-                    peak = int(np.argmax(np.abs(fft[mask])))
-                    f_peak = float(freqs[mask][peak])
+            n = self._ring.size
+            idx = self._ring_idx
+            self._ring_sum += gmean - float(self._ring[idx])
+            self._ring[idx] = gmean
+            self._ring_idx = (idx + 1) % n
+            if self._ring_count < n:
+                self._ring_count += 1
+
+            if self._ring_count == n:
+                # El orden circular sólo altera la fase, no |FFT|:
+                # no hace falta desenrollar el buffer.
+                np.subtract(self._ring, self._ring_sum / n, out=self._fft_in)
+                spectrum = fft.rfft(self._fft_in, workers=-1)
+                if self._mask_idx.size:
+                    peak = int(np.argmax(np.abs(spectrum[self._mask_idx])))
+                    f_peak = float(self._mask_freqs[peak])
                     est_hr = float(f_peak * 60.0)
                     if self.bpm_smooth is None:
                         self.bpm_smooth = est_hr
@@ -281,39 +779,51 @@ class EulerianProcessorModule(BaseDevice):
             self.locked = False
             self.bpm_locked = None
 
+    def _update_freq_mask(self) -> None:
+        """Precalcula frecuencias de la FFT y los índices de la banda."""
+        freqs = fft.rfftfreq(self._ring.size, d=1.0 / self.fps)
+        mask = (freqs >= self.low_freq) & (freqs <= self.high_freq)
+        self._mask_idx = np.nonzero(mask)[0]
+        self._mask_freqs = freqs[self._mask_idx]
+
     # ------------------------------------------------------------------
     # Overlays
     # ------------------------------------------------------------------
     def _draw_overlays(self, vis: np.ndarray, x: int, y: int,
-                       w: int, h: int, now: float) -> np.ndarray:
-        """Dibuja rectángulo ROI, textos de estado y BPM (igual que prueba.py)."""
+                       w: int, h: int, now: float,
+                       st: Optional[Any] = None) -> np.ndarray:
+        """Dibuja rectángulo ROI, textos de estado y BPM (igual que prueba.py).
+
+        ``st`` es una instantánea del estado BPM/estabilidad (por defecto
+        ``self``), necesaria cuando las etapas corren en hilos distintos.
+        """
+        if st is None:
+            st = self
         # Rectángulo ROI
-        color_rect = (0, 255, 0) if self.is_stable else (0, 0, 255)
+        color_rect = (0, 255, 0) if st.is_stable else (0, 0, 255)
         cv2.rectangle(vis, (x, y), (x + w, y + h), color_rect, 2)
 
         # Título sobre ROI
         title = "Coloque la zona a medir dentro del recuadro"
-        cv2.putText(vis, title, (x, max(30, y - 10)),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2,
-                    cv2.LINE_AA)
+        self._blit_text(vis, title, (x, max(30, y - 10)),
+                        0.6, (255, 255, 255), 2)
 
         # Mensajes de estado
-        if not self.is_stable and not self.locked:
-            cv2.putText(vis, "No se mueva, estabilizando...", (20, 70),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2,
-                        cv2.LINE_AA)
-        elif self.is_stable and not self.locked:
-            faltan = max(0.0, self.stable_secs - self.stable_time)
+        if not st.is_stable and not st.locked:
+            self._blit_text(vis, "No se mueva, estabilizando...", (20, 70),
+                            0.9, (0, 255, 255), 2)
+        elif st.is_stable and not st.locked:
+            faltan = max(0.0, self.stable_secs - st.stable_time)
             cv2.putText(vis, f"Verificando... {faltan:0.1f}s", (20, 70),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2,
                         cv2.LINE_AA)
 
         # BPM
-        if self.locked and self.bpm_locked is not None:
-            cv2.putText(vis, f"{self.bpm_locked} bpm", (20, 40),
+        if st.locked and st.bpm_locked is not None:
+            cv2.putText(vis, f"{st.bpm_locked} bpm", (20, 40),
                         cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3,
                         cv2.LINE_AA)
-            restante = self.lock_until - now
+            restante = st.lock_until - now
             cv2.putText(
                 vis,
                 f"Lectura fijada {restante:0.0f}s",
@@ -321,34 +831,88 @@ class EulerianProcessorModule(BaseDevice):
                 cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2,
                 cv2.LINE_AA,
             )
-        elif self.bpm_smooth is not None:
-            cv2.putText(vis, f"{int(round(self.bpm_smooth))} bpm", (20, 40),
+        elif st.bpm_smooth is not None:
+            cv2.putText(vis, f"{int(round(st.bpm_smooth))} bpm", (20, 40),
                         cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 200, 0), 2,
                         cv2.LINE_AA)
 
         # Footer: parámetros EVM y movimiento
-        cv2.putText(
+        self._blit_text(
             vis,
             f"EVM alpha={self.amplification_factor} "
             f"[{self.low_freq}-{self.high_freq}]Hz  L={self.pyramid_levels}",
             (20, vis.shape[0] - 50),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA,
+            0.7, (255, 255, 255), 2,
         )
         cv2.putText(
             vis,
-            f"mov={self.motion:0.3f}  estable> {self.motion_thresh:0.3f}",
+            f"mov={st.motion:0.3f}  estable> {self.motion_thresh:0.3f}",
             (20, vis.shape[0] - 20),
             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 1, cv2.LINE_AA,
         )
 
         return vis
 
+    def _get_text_sprite(self, text: str, scale: float,
+                         color: Tuple[int, int, int],
+                         thickness: int) -> Tuple[np.ndarray, ...]:
+        """Rasteriza una vez un texto estático (LINE_AA) como sprite."""
+        key = (text, scale, color, thickness)
+        sprite = self._sprite_cache.get(key)
+        if sprite is None:
+            (tw, th), baseline = cv2.getTextSize(
+                text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness
+            )
+            pad = thickness + 1
+            mask = np.zeros((th + baseline + 2 * pad, tw + 2 * pad),
+                            dtype=np.uint8)
+            cv2.putText(mask, text, (pad, pad + th),
+                        cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness,
+                        cv2.LINE_AA)
+            alpha = cv2.merge([mask, mask, mask])
+            fg = np.empty_like(alpha)
+            fg[:] = color
+            # Sprite premultiplicado en uint8: out = roi*(255-a)/255 + fg*a/255
+            fg = cv2.multiply(fg, alpha, scale=1.0 / 255.0)
+            sprite = (fg, 255 - alpha, pad + th, pad)
+            self._sprite_cache[key] = sprite
+        return sprite
+
+    def _blit_text(self, vis: np.ndarray, text: str, org: Tuple[int, int],
+                   scale: float, color: Tuple[int, int, int],
+                   thickness: int) -> None:
+        """Compone un texto cacheado sobre ``vis`` (equivale a putText)."""
+        fg, inv, dy, dx = self._get_text_sprite(
+            text, scale, color, thickness
+        )
+        H, W = vis.shape[:2]
+        sh, sw = inv.shape[:2]
+        x0 = org[0] - dx
+        y0 = org[1] - dy
+        vx0, vy0 = max(0, x0), max(0, y0)
+        vx1, vy1 = min(W, x0 + sw), min(H, y0 + sh)
+        if vx0 >= vx1 or vy0 >= vy1:
+            return
+        sx0, sy0 = vx0 - x0, vy0 - y0
+        sx1, sy1 = sx0 + (vx1 - vx0), sy0 + (vy1 - vy0)
+        roi = vis[vy0:vy1, vx0:vx1]
+        cv2.add(
+            cv2.multiply(roi, inv[sy0:sy1, sx0:sx1], scale=1.0 / 255.0),
+            fg[sy0:sy1, sx0:sx1], dst=roi,
+        )
+
     # ------------------------------------------------------------------
     # Utilidades
     # ------------------------------------------------------------------
     def cleanup(self) -> None:
         if self.temporal_filter:
             self.temporal_filter.reset()
+        self._g_lp = None
+        self._g_hp = None
+        self._lp_gpu = None
+        self._hp_gpu = None
+        self._lp_ocl = None
+        self._hp_ocl = None
         self.logger.info("Recursos del procesador liberados")
 
     def get_info(self) -> Dict[str, Any]:
@@ -358,6 +922,8 @@ class EulerianProcessorModule(BaseDevice):
             "frequency_range": f"{self.low_freq}-{self.high_freq} Hz",
             "pyramid_levels": self.pyramid_levels,
             "chrom_atten": self.chrom_atten,
+            "backend": ("cuda" if self._use_cuda
+                        else "opencl" if self._use_ocl else "cpu"),
             "frames_received": self.frame_count,
             "frames_processed": self.processed_frames,
             "bpm_smooth": self.bpm_smooth,
@@ -368,10 +934,20 @@ class EulerianProcessorModule(BaseDevice):
     def set_amplification(self, factor: float) -> None:
         old = self.amplification_factor
         self.amplification_factor = factor
+        self._sprite_cache.clear()
         self.logger.info(f"Factor de amplificación cambiado: {old} -> {factor}")
 
     def set_frequency_range(self, low_freq: float, high_freq: float) -> None:
         self.low_freq = low_freq
         self.high_freq = high_freq
+        self._sprite_cache.clear()
         self.temporal_filter = _TemporalIIRBandpass(low_freq, high_freq, self.fps)
+        self._g_lp = None
+        self._g_hp = None
+        self._lp_gpu = None
+        self._hp_gpu = None
+        self._lp_ocl = None
+        self._hp_ocl = None
+        if self._ring is not None:
+            self._update_freq_mask()
         self.logger.info(f"Rango de frecuencias cambiado: {low_freq}-{high_freq} Hz")
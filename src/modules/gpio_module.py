@@ -3,8 +3,9 @@ GPIOModule - Módulo para control de GPIO en Jetson Nano.
 Permite controlar pines GPIO para LEDs, botones, sensores, etc.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 import logging
+import threading
 
 import sys
 sys.path.append('src')
@@ -61,6 +62,13 @@ class GPIOModule(BaseDevice):
         self.mode = config.get("mode", "BOARD")
         self.pins_config = config.get("pins", {})
         self.configured_pins = {}
+        # Último valor escrito por pin (una sola búsqueda en el camino caliente)
+        self._pin_values: Dict[int, bool] = {}
+        # Niveles de salida; en initialize se enlazan los de Jetson.GPIO
+        self._HIGH, self._LOW = True, False
+        # Serializa configuración y escrituras (RMW de varios registros);
+        # las lecturas no lo necesitan
+        self._io_lock = threading.RLock()
         
         self.gpio_available = GPIO_AVAILABLE
     
@@ -83,6 +91,7 @@ class GPIOModule(BaseDevice):
                 GPIO.setmode(GPIO.BOARD)
             else:
                 GPIO.setmode(GPIO.BCM)
+            self._HIGH, self._LOW = GPIO.HIGH, GPIO.LOW
             
             # Configurar warnings
             GPIO.setwarnings(False)
@@ -184,42 +193,46 @@ class GPIOModule(BaseDevice):
         Returns:
             True si se configuró correctamente
         """
-        try:
-            direction = pin_config.get("direction", "OUT")
-            initial = pin_config.get("initial", False)
-            pull_up_down = pin_config.get("pull_up_down", None)
-            
-            if not self.gpio_available:
+        with self._io_lock:
+            try:
+                direction = pin_config.get("direction", "OUT")
+                initial = pin_config.get("initial", False)
+                pull_up_down = pin_config.get("pull_up_down", None)
+                
+                if not self.gpio_available:
+                    self.configured_pins[pin] = {
+                        "direction": direction,
+                        "initial": initial
+                    }
+                    self._pin_values[pin] = bool(initial)
+                    return True
+                
+                # Configurar según dirección
+                if direction == "OUT":
+                    GPIO.setup(pin, GPIO.OUT, initial=GPIO.HIGH if initial else GPIO.LOW)
+                else:
+                    pud = GPIO.PUD_OFF
+                    if pull_up_down == "up":
+                        pud = GPIO.PUD_UP
+                    elif pull_up_down == "down":
+                        pud = GPIO.PUD_DOWN
+                    
+                    GPIO.setup(pin, GPIO.IN, pull_up_down=pud)
+                
                 self.configured_pins[pin] = {
                     "direction": direction,
-                    "value": initial
+                    "initial": initial,
+                    "pull_up_down": pull_up_down
                 }
-                return True
-            
-            # Configurar según dirección
-            if direction == "OUT":
-                GPIO.setup(pin, GPIO.OUT, initial=GPIO.HIGH if initial else GPIO.LOW)
-            else:
-                pud = GPIO.PUD_OFF
-                if pull_up_down == "up":
-                    pud = GPIO.PUD_UP
-                elif pull_up_down == "down":
-                    pud = GPIO.PUD_DOWN
+                if direction == "OUT":
+                    self._pin_values[pin] = bool(initial)
                 
-                GPIO.setup(pin, GPIO.IN, pull_up_down=pud)
-            
-            self.configured_pins[pin] = {
-                "direction": direction,
-                "initial": initial,
-                "pull_up_down": pull_up_down
-            }
-            
-            self.logger.debug(f"Pin {pin} configurado como {direction}")
-            return True
+                self.logger.debug(f"Pin {pin} configurado como {direction}")
+                return True
             
-        except Exception as e:
-            self.logger.error(f"Error al configurar pin {pin}: {e}")
-            return False
+            except Exception as e:
+                self.logger.error(f"Error al configurar pin {pin}: {e}")
+                return False
     
     def setup_pin(self, pin: int, direction: str, initial: bool = False) -> bool:
         """
@@ -249,16 +262,30 @@ class GPIOModule(BaseDevice):
         Returns:
             Estado del pin (True=HIGH, False=LOW)
         """
-        if not self.gpio_available:
-            return self.configured_pins.get(pin, {}).get("value", False)
-        
         try:
-            value = GPIO.input(pin)
-            return bool(value)
+            return self.read_pin_fast(pin)
         except Exception as e:
             self.logger.error(f"Error al leer pin {pin}: {e}")
             return False
     
+    def read_pin_fast(self, pin: int) -> bool:
+        """
+        Lee un pin sin tomar el lock ni capturar errores.
+        
+        Seguro con lecturas concurrentes: la lectura del registro de nivel
+        (32 bits alineado) es atómica en Jetson/Raspberry Pi. Pensado para
+        bucles de sondeo.
+        
+        Args:
+            pin: Número de pin
+            
+        Returns:
+            Estado del pin (True=HIGH, False=LOW)
+        """
+        if not self.gpio_available:
+            return self._pin_values.get(pin, False)
+        return bool(GPIO.input(pin))
+    
     def write_pin(self, pin: int, value: bool) -> bool:
         """
         Escribe un valor a un pin.
@@ -270,17 +297,48 @@ class GPIOModule(BaseDevice):
         Returns:
             True si se escribió correctamente
         """
-        if not self.gpio_available:
-            if pin in self.configured_pins:
-                self.configured_pins[pin]["value"] = value
+        with self._io_lock:
+            if self.gpio_available:
+                try:
+                    GPIO.output(pin, self._HIGH if value else self._LOW)
+                except Exception as e:
+                    self.logger.error(f"Error al escribir pin {pin}: {e}")
+                    return False
+            self._pin_values[pin] = value
             return True
+    
+    def write_pins(self, values: Dict[int, bool]) -> bool:
+        """
+        Escribe varios pines en una sola llamada a GPIO.output.
         
-        try:
-            GPIO.output(pin, GPIO.HIGH if value else GPIO.LOW)
+        Los pines cuyo último valor escrito ya coincide se omiten.
+        
+        Args:
+            values: Dict {pin: valor} (True=HIGH, False=LOW)
+            
+        Returns:
+            True si se escribió correctamente
+        """
+        with self._io_lock:
+            pin_values = self._pin_values
+            to_write = {
+                pin: bool(value) for pin, value in values.items()
+                if pin_values.get(pin) != bool(value)
+            }
+            if not to_write:
+                return True
+            
+            if self.gpio_available:
+                try:
+                    high, low = self._HIGH, self._LOW
+                    GPIO.output(list(to_write.keys()),
+                                [high if v else low for v in to_write.values()])
+                except Exception as e:
+                    self.logger.error(f"Error al escribir pines {list(to_write)}: {e}")
+                    return False
+            
+            pin_values.update(to_write)
             return True
-        except Exception as e:
-            self.logger.error(f"Error al escribir pin {pin}: {e}")
-            return False
     
     def toggle_pin(self, pin: int) -> bool:
         """
@@ -292,7 +350,79 @@ class GPIOModule(BaseDevice):
         Returns:
             Nuevo valor del pin
         """
-        current = self.read_pin(pin)
-        new_value = not current
-        self.write_pin(pin, new_value)
-        return new_value
+        with self._io_lock:
+            # Las salidas se conmutan desde el último valor escrito (sin leer)
+            current = self._pin_values.get(pin)
+            if current is None:
+                current = self.read_pin(pin)
+            new_value = not current
+            self.write_pin(pin, new_value)
+            return new_value
+    
+    def _edge_constant(self, edge: str):
+        """Traduce 'rising'/'falling'/'both' a la constante de Jetson.GPIO."""
+        edges = {"rising": GPIO.RISING, "falling": GPIO.FALLING, "both": GPIO.BOTH}
+        if edge not in edges:
+            raise ValueError(f"Flanco desconocido: {edge}")
+        return edges[edge]
+    
+    def wait_for_edge(self, pin: int, edge: str = "both",
+                      timeout_ms: Optional[int] = None) -> Optional[int]:
+        """
+        Bloquea hasta detectar un flanco en el pin (sin sondeo activo).
+        
+        El hilo espera en el kernel (epoll sobre el descriptor del pin) en
+        lugar de llamar a ``read_pin`` en bucle, así que no consume CPU ni
+        pierde pulsos cortos.
+        
+        Args:
+            pin: Número de pin (configurado como entrada)
+            edge: 'rising', 'falling' o 'both'
+            timeout_ms: Tiempo máximo de espera (None = sin límite)
+            
+        Returns:
+            El pin si hubo flanco, None si expiró el tiempo o hubo error
+        """
+        if not self.gpio_available:
+            self.logger.warning("wait_for_edge no disponible en modo simulación")
+            return None
+        
+        try:
+            if timeout_ms is None:
+                return GPIO.wait_for_edge(pin, self._edge_constant(edge))
+            return GPIO.wait_for_edge(pin, self._edge_constant(edge),
+                                      timeout=timeout_ms)
+        except Exception as e:
+            self.logger.error(f"Error esperando flanco en pin {pin}: {e}")
+            return None
+    
+    def on_edge(self, pin: int, edge: str, callback: Callable[[int], None],
+                bouncetime: Optional[int] = None) -> bool:
+        """
+        Registra un callback que se ejecuta en cada flanco del pin.
+        
+        Args:
+            pin: Número de pin (configurado como entrada)
+            edge: 'rising', 'falling' o 'both'
+            callback: Función que recibe el número de pin
+            bouncetime: Tiempo antirrebote en ms (opcional)
+            
+        Returns:
+            True si se registró correctamente
+        """
+        if not self.gpio_available:
+            self.logger.warning("on_edge no disponible en modo simulación")
+            return False
+        
+        try:
+            with self._io_lock:
+                if bouncetime is None:
+                    GPIO.add_event_detect(pin, self._edge_constant(edge),
+                                          callback=callback)
+                else:
+                    GPIO.add_event_detect(pin, self._edge_constant(edge),
+                                          callback=callback, bouncetime=bouncetime)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error al registrar flanco en pin {pin}: {e}")
+            return False
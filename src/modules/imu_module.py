@@ -3,6 +3,7 @@ IMUModule - Módulo ejemplo para sensores IMU (acelerómetro, giroscopio).
 Este es un módulo de ejemplo para mostrar cómo integrar sensores adicionales.
 """
 
+import math
 import numpy as np
 from typing import Any, Dict, Optional, Tuple
 import logging
@@ -12,6 +13,15 @@ sys.path.append('src')
 
 from core.base_device import BaseDevice, DeviceStatus
 
+_RAD2DEG = 180.0 / math.pi
+
+
+def _orient(ax: float, ay: float, az: float) -> Tuple[float, float, float]:
+    """Roll/pitch (grados) desde el acelerómetro con ``math`` escalar."""
+    roll = math.atan2(ay, az) * _RAD2DEG
+    pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az)) * _RAD2DEG
+    return roll, pitch, 0.0
+
 
 class IMUModule(BaseDevice):
     """
@@ -50,10 +60,14 @@ class IMUModule(BaseDevice):
         self.sensor = None
         self.reading_count = 0
         
-        # Últimas lecturas
-        self.last_accel = np.zeros(3)
-        self.last_gyro = np.zeros(3)
-        self.last_orientation = np.zeros(3)
+        # Últimas lecturas: buffers fijos que se rellenan en cada muestra
+        self._rng = np.random.default_rng()
+        self._accel_buf = np.zeros(3)
+        self._gyro_buf = np.zeros(3)
+        self._orientation_buf = np.zeros(3)
+        self.last_accel = self._accel_buf
+        self.last_gyro = self._gyro_buf
+        self.last_orientation = self._orientation_buf
     
     def initialize(self) -> bool:
         """
@@ -123,14 +137,11 @@ class IMUModule(BaseDevice):
                 accel = self._read_accelerometer()
                 gyro = self._read_gyroscope()
             
-            # Actualizar últimas lecturas
-            self.last_accel = accel
-            self.last_gyro = gyro
+            # last_accel/last_gyro/last_orientation son los propios buffers
             self.reading_count += 1
             
             # Calcular orientación (simplificado)
             orientation = self._calculate_orientation(accel, gyro)
-            self.last_orientation = orientation
             
             return {
                 "accelerometer": {
@@ -189,22 +200,24 @@ class IMUModule(BaseDevice):
         Simula lecturas de acelerómetro.
         
         Returns:
-            Array con valores [x, y, z] en g
+            Array con valores [x, y, z] en g (buffer reutilizado)
         """
-        # Simular gravedad con algo de ruido
-        base = np.array([0.0, 0.0, 1.0])  # Gravedad en eje Z
-        noise = np.random.normal(0, 0.05, 3)
-        return base + noise
+        # Simular gravedad (eje Z) con algo de ruido, sin reservar memoria
+        buf = self._accel_buf
+        self._rng.standard_normal(out=buf)
+        buf *= 0.05
+        buf[2] += 1.0
+        return buf
     
     def _simulate_gyroscope(self) -> np.ndarray:
         """
         Simula lecturas de giroscopio.
         
         Returns:
-            Array con valores [x, y, z] en grados/segundo
+            Array con valores [x, y, z] en grados/segundo (buffer reutilizado)
         """
         # Simular pequeñas rotaciones
-        return np.random.normal(0, 1.0, 3)
+        return self._rng.standard_normal(out=self._gyro_buf)
     
     def _read_accelerometer(self) -> np.ndarray:
         """
@@ -216,7 +229,8 @@ class IMUModule(BaseDevice):
         if self.sensor:
             # Aquí iría la lectura real, por ejemplo:
             # accel_data = self.sensor.get_accel_data()
-            # return np.array([accel_data['x'], accel_data['y'], accel_data['z']])
+            # self._accel_buf[:] = (accel_data['x'], accel_data['y'], accel_data['z'])
+            # return self._accel_buf
             pass
         
         return self._simulate_accelerometer()
@@ -231,7 +245,8 @@ class IMUModule(BaseDevice):
         if self.sensor:
             # Aquí iría la lectura real, por ejemplo:
             # gyro_data = self.sensor.get_gyro_data()
-            # return np.array([gyro_data['x'], gyro_data['y'], gyro_data['z']])
+            # self._gyro_buf[:] = (gyro_data['x'], gyro_data['y'], gyro_data['z'])
+            # return self._gyro_buf
             pass
         
         return self._simulate_gyroscope()
@@ -245,16 +260,14 @@ class IMUModule(BaseDevice):
             gyro: Valores del giroscopio
             
         Returns:
-            Array con [roll, pitch, yaw] en grados
+            Array con [roll, pitch, yaw] en grados (buffer reutilizado)
         """
         # Cálculo simplificado usando solo acelerómetro
         # En implementación real usar filtro complementario o Kalman
-        
-        roll = np.arctan2(accel[1], accel[2]) * 180 / np.pi
-        pitch = np.arctan2(-accel[0], np.sqrt(accel[1]**2 + accel[2]**2)) * 180 / np.pi
-        yaw = 0  # No se puede calcular yaw solo con acelerómetro
-        
-        return np.array([roll, pitch, yaw])
+        # Yaw no se puede calcular solo con acelerómetro (queda en 0)
+        ax, ay, az = accel.tolist()
+        self._orientation_buf[:] = _orient(ax, ay, az)
+        return self._orientation_buf
     
     def calibrate(self) -> bool:
         """
@@ -266,13 +279,19 @@ class IMUModule(BaseDevice):
         self.logger.info("Iniciando calibración del IMU...")
         
         # Recolectar muestras en reposo
-        samples = []
-        for _ in range(100):
-            accel = self._read_accelerometer()
-            samples.append(accel)
+        n_samples = 100
+        if self.simulation_mode:
+            # Mismo modelo que _simulate_accelerometer, en un único sorteo
+            samples = self._rng.standard_normal((n_samples, 3))
+            samples *= 0.05
+            samples[:, 2] += 1.0
+        else:
+            samples = np.empty((n_samples, 3))
+            for i in range(n_samples):
+                samples[i] = self._read_accelerometer()
         
         # Calcular offset
-        offset = np.mean(samples, axis=0)
+        offset = samples.mean(axis=0)
         self.logger.info(f"Calibración completada. Offset: {offset}")
         
         return True
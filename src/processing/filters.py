@@ -4,15 +4,64 @@ Filters - Filtros de procesamiento de imagen y video.
 
 import cv2
 import numpy as np
-from typing import Tuple, Optional
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Tuple, Optional
 from scipy import signal
 
+# Numba es opcional: mediana temporal en uint8 sin pasar por float
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _median_u8(stack, out):
+        """Mediana por píxel de una pila uint8 (N, H, W, C) con N pequeño.
+
+        Ordenación por inserción de los N valores de cada píxel; con N par
+        devuelve la media truncada de los dos centrales (como np.median +
+        astype(uint8)).
+        """
+        n, h, w, c = stack.shape
+        mid = n // 2
+        for y in prange(h):
+            buf = np.empty(n, np.int32)
+            for x in range(w):
+                for ch in range(c):
+                    for i in range(n):
+                        v = np.int32(stack[i, y, x, ch])
+                        j = i
+                        while j > 0 and buf[j - 1] > v:
+                            buf[j] = buf[j - 1]
+                            j -= 1
+                        buf[j] = v
+                    if n % 2:
+                        out[y, x, ch] = buf[mid]
+                    else:
+                        out[y, x, ch] = (buf[mid - 1] + buf[mid]) // 2
+
 
 class Filters:
     """
     Colección de filtros para procesamiento de imagen y video.
     """
     
+    # Cachés acotadas: LUTs de balance de color por (rojo, verde, azul)
+    _color_luts: Dict[Tuple[float, float, float], np.ndarray] = {}
+    _MAX_CACHE_ENTRIES = 64
+    # Kernels de nitidez float32 por ``amount``
+    _sharpen_kernels: Dict[float, np.ndarray] = {}
+    # Kernels gaussianos 1D float32 por tamaño
+    _gauss_kernels: Dict[int, np.ndarray] = {}
+    # Buffers float32 reutilizados por temporal_filter (por forma e hilo)
+    _accum_cache: Dict[tuple, np.ndarray] = {}
+    # Filtros píxel a píxel sobre uint8: componibles en una sola LUT
+    _POINTWISE_OPS = ("adjust_brightness_contrast", "color_balance")
+    
     @staticmethod
     def gaussian_blur(frame: np.ndarray, kernel_size: int = 5) -> np.ndarray:
         """
@@ -25,7 +74,17 @@ class Filters:
         Returns:
             Frame filtrado
         """
-        return cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0)
+        if kernel_size < 7:
+            # Para kernels pequeños GaussianBlur usa su ruta en punto fijo
+            return cv2.GaussianBlur(frame, (kernel_size, kernel_size), 0)
+        
+        kernel = Filters._gauss_kernels.get(kernel_size)
+        if kernel is None:
+            kernel = cv2.getGaussianKernel(kernel_size, 0).astype(np.float32)
+            if len(Filters._gauss_kernels) >= Filters._MAX_CACHE_ENTRIES:
+                Filters._gauss_kernels.clear()
+            Filters._gauss_kernels[kernel_size] = kernel
+        return cv2.sepFilter2D(frame, -1, kernel, kernel)
     
     @staticmethod
     def bilateral_filter(frame: np.ndarray, d: int = 9, 
@@ -56,9 +115,14 @@ class Filters:
         Returns:
             Frame filtrado
         """
-        kernel = np.array([[-1, -1, -1],
-                          [-1,  9, -1],
-                          [-1, -1, -1]]) * amount
+        kernel = Filters._sharpen_kernels.get(amount)
+        if kernel is None:
+            kernel = np.array([[-1, -1, -1],
+                               [-1,  9, -1],
+                               [-1, -1, -1]], dtype=np.float32) * np.float32(amount)
+            if len(Filters._sharpen_kernels) >= Filters._MAX_CACHE_ENTRIES:
+                Filters._sharpen_kernels.clear()
+            Filters._sharpen_kernels[amount] = kernel
         return cv2.filter2D(frame, -1, kernel)
     
     @staticmethod
@@ -81,11 +145,12 @@ class Filters:
         if method == "canny":
             return cv2.Canny(gray, threshold1, threshold2)
         elif method == "sobel":
-            sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=5)
-            sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=5)
-            return np.sqrt(sobelx**2 + sobely**2).astype(np.uint8)
+            sobelx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=5)
+            sobely = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=5)
+            # Magnitud en una pasada y saturación a uint8
+            return cv2.convertScaleAbs(cv2.magnitude(sobelx, sobely))
         elif method == "laplacian":
-            return cv2.Laplacian(gray, cv2.CV_64F).astype(np.uint8)
+            return cv2.convertScaleAbs(cv2.Laplacian(gray, cv2.CV_16S))
         else:
             return gray
     
@@ -101,14 +166,17 @@ class Filters:
             contrast: Ajuste de contraste (0.5 a 3.0)
             
         Returns:
-            Frame ajustado
+            Frame ajustado (el propio ``frame`` si el ajuste es neutro)
         """
+        if contrast == 1.0 and brightness == 0:
+            return frame
         adjusted = cv2.convertScaleAbs(frame, alpha=contrast, beta=brightness)
         return adjusted
     
     @staticmethod
     def color_balance(frame: np.ndarray, red_gain: float = 1.0, 
-                     green_gain: float = 1.0, blue_gain: float = 1.0) -> np.ndarray:
+                     green_gain: float = 1.0, blue_gain: float = 1.0,
+                     inplace: bool = False) -> np.ndarray:
         """
         Ajusta el balance de color.
         
@@ -117,16 +185,25 @@ class Filters:
             red_gain: Ganancia del canal rojo
             green_gain: Ganancia del canal verde
             blue_gain: Ganancia del canal azul
+            inplace: Escribir el resultado sobre ``frame`` (sin reservar memoria)
             
         Returns:
             Frame balanceado
         """
-        result = frame.copy().astype(np.float32)
-        result[:, :, 0] *= blue_gain
-        result[:, :, 1] *= green_gain
-        result[:, :, 2] *= red_gain
+        key = (red_gain, green_gain, blue_gain)
+        lut = Filters._color_luts.get(key)
+        if lut is None:
+            # Mapa afín por canal: sólo hay 256 valores posibles de entrada
+            levels = np.arange(256, dtype=np.float32)
+            lut = np.stack([levels * blue_gain,
+                            levels * green_gain,
+                            levels * red_gain], axis=1)
+            lut = np.clip(lut, 0, 255).astype(np.uint8).reshape(256, 1, 3)
+            if len(Filters._color_luts) >= Filters._MAX_CACHE_ENTRIES:
+                Filters._color_luts.clear()
+            Filters._color_luts[key] = lut
         
-        return np.clip(result, 0, 255).astype(np.uint8)
+        return cv2.LUT(frame, lut, dst=frame if inplace else None)
     
     @staticmethod
     def denoise(frame: np.ndarray, method: str = "fastNlMeans", 
@@ -154,6 +231,44 @@ class Filters:
         else:
             return frame
     
+    @staticmethod
+    def denoise_temporal(frames: list, index: Optional[int] = None,
+                         strength: int = 10, temporal_window: int = 5) -> np.ndarray:
+        """
+        Reduce el ruido de un frame usando también sus vecinos temporales.
+        
+        Usa la variante *Multi* de fastNlMeans, que comparte la búsqueda de
+        parches entre frames: más barata por frame de salida que llamar N
+        veces a ``denoise``.
+        
+        Args:
+            frames: Lista de frames (misma forma y tipo uint8)
+            index: Frame a filtrar (por defecto el central)
+            strength: Fuerza del filtro
+            temporal_window: Número de frames usados (impar)
+            
+        Returns:
+            Frame filtrado
+        """
+        if not frames:
+            return None
+        
+        n = len(frames)
+        if index is None:
+            index = n // 2
+        # La ventana debe ser impar y caber alrededor de ``index``
+        window = min(temporal_window, 2 * min(index, n - 1 - index) + 1)
+        if window % 2 == 0:
+            window -= 1
+        if window < 3:
+            return Filters.denoise(frames[index], "fastNlMeans", strength)
+        
+        if len(frames[index].shape) == 3:
+            return cv2.fastNlMeansDenoisingColoredMulti(
+                frames, index, window, None, strength, strength, 7, 21)
+        return cv2.fastNlMeansDenoisingMulti(
+            frames, index, window, None, strength, 7, 21)
+    
     @staticmethod
     def temporal_filter(frames: list, method: str = "average") -> np.ndarray:
         """
@@ -169,26 +284,61 @@ class Filters:
         if not frames:
             return None
         
-        frames_array = np.array(frames, dtype=np.float32)
+        if (method == "median" and NUMBA_AVAILABLE
+                and frames[0].dtype == np.uint8):
+            # Pila uint8 (1 byte/píxel) y mediana por inserción en Numba
+            stack = np.stack(frames, axis=0)
+            if stack.ndim == 3:
+                stack = stack[..., np.newaxis]
+            out = np.empty(stack.shape[1:], dtype=np.uint8)
+            _median_u8(stack, out)
+            return out.reshape(frames[0].shape)
         
         if method == "average":
-            return np.mean(frames_array, axis=0).astype(np.uint8)
-        elif method == "median":
+            # Acumular in situ: sin pila float32 de N frames ni temporales
+            accum = Filters._float_buffer("accum", frames[0].shape)
+            np.copyto(accum, frames[0])
+            for frame in frames[1:]:
+                np.add(accum, frame, out=accum)
+            np.divide(accum, len(frames), out=accum)
+            return accum.astype(np.uint8)
+        elif method not in ("median", "gaussian"):
+            return frames[-1]
+        
+        frames_array = Filters._float_buffer(
+            "stack", (len(frames),) + frames[0].shape)
+        for i, frame in enumerate(frames):
+            frames_array[i] = frame
+        
+        if method == "median":
             return np.median(frames_array, axis=0).astype(np.uint8)
-        elif method == "gaussian":
+        else:
             # Pesos gaussianos centrados
             n = len(frames)
             sigma = n / 4.0
-            weights = signal.gaussian(n, sigma)
+            weights = signal.windows.gaussian(n, sigma).astype(np.float32)
             weights /= weights.sum()
             
-            result = np.zeros_like(frames[0], dtype=np.float32)
-            for i, frame in enumerate(frames):
-                result += frame.astype(np.float32) * weights[i]
-            
+            # Suma ponderada de los N frames en una sola reducción
+            result = np.tensordot(weights, frames_array, axes=(0, 0))
+            np.clip(result, 0, 255, out=result)
             return result.astype(np.uint8)
-        else:
-            return frames[-1]
+    
+    @staticmethod
+    def _float_buffer(name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Devuelve un buffer float32 reutilizable (contenido indefinido).
+        
+        La clave incluye el hilo: llamadas concurrentes no comparten buffer.
+        """
+        key = (name, shape, threading.get_ident())
+        buf = Filters._accum_cache.get(key)
+        if buf is None:
+            if len(Filters._accum_cache) >= Filters._MAX_CACHE_ENTRIES:
+                Filters._accum_cache.clear()
+            buf = np.empty(shape, dtype=np.float32)
+            Filters._accum_cache[key] = buf
+        return buf
     
     @staticmethod
     def motion_amplification(frame_current: np.ndarray, frame_previous: np.ndarray,
@@ -207,18 +357,10 @@ class Filters:
         if frame_previous is None:
             return frame_current
         
-        # Calcular diferencia
-        diff = frame_current.astype(np.float32) - frame_previous.astype(np.float32)
-        
-        # Amplificar
-        amplified_diff = diff * amplification
-        
-        # Sumar de vuelta al frame original
-        result = frame_current.astype(np.float32) + amplified_diff
-        
-        # Clip y convertir
-        result = np.clip(result, 0, 255)
-        return result.astype(np.uint8)
+        # actual + a * (actual - anterior) en una pasada, con saturación
+        amplification = float(amplification)
+        return cv2.addWeighted(frame_current, 1.0 + amplification,
+                               frame_previous, -amplification, 0.0)
     
     @staticmethod
     def resize_maintain_aspect(frame: np.ndarray, target_size: Tuple[int, int],
@@ -245,12 +387,129 @@ class Filters:
         # Redimensionar
         resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
         
-        # Crear canvas con color de relleno
-        canvas = np.full((target_h, target_w, 3), fill_color, dtype=np.uint8)
+        # Centrar con bordes de color de relleno (cada píxel se escribe una vez)
+        top = (target_h - new_h) // 2
+        left = (target_w - new_w) // 2
+        return cv2.copyMakeBorder(resized, top, target_h - new_h - top,
+                                  left, target_w - new_w - left,
+                                  cv2.BORDER_CONSTANT, value=fill_color)
+
+
+    @staticmethod
+    def compile_pipeline(ops: List[Tuple[str, Dict[str, Any]]],
+                         frame_shape: Optional[Tuple[int, ...]] = None
+                         ) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Compila una cadena de filtros en una función de un solo argumento.
+        
+        Los filtros píxel a píxel consecutivos (brillo/contraste, balance de
+        color) son mapas uint8 -> uint8 por canal: se aplican a una LUT
+        identidad y quedan fusionados en un único ``cv2.LUT``, así el frame
+        se recorre una sola vez. El resto (nitidez, desenfoque, ...) se
+        ejecuta como etapa independiente.
+        
+        Args:
+            ops: Lista de (nombre del método de Filters, kwargs)
+                 Ejemplo: [("adjust_brightness_contrast", {"contrast": 1.2}),
+                           ("color_balance", {"red_gain": 1.1}),
+                           ("sharpen", {"amount": 0.5})]
+            frame_shape: Forma de los frames (para LUT de 1 o 3 canales)
+            
+        Returns:
+            Función frame -> frame filtrado
+        """
+        channels = 3
+        if frame_shape is not None:
+            channels = frame_shape[2] if len(frame_shape) == 3 else 1
+        stages: List[Callable[[np.ndarray], np.ndarray]] = []
+        group: List[Tuple[Callable, Dict[str, Any]]] = []
+        
+        def direct(fn, kwargs):
+            return lambda frame, f=fn, kw=dict(kwargs): f(frame, **kw)
+        
+        def flush_group():
+            if len(group) == 1:
+                # Un solo filtro: la llamada directa es más barata que la LUT
+                stages.append(direct(*group[0]))
+            elif group:
+                lut = np.arange(256, dtype=np.uint8).reshape(256, 1)
+                if channels > 1:
+                    lut = np.repeat(lut[:, :, np.newaxis], channels, axis=2)
+                for fn, kwargs in group:
+                    lut = fn(lut, **kwargs)
+                if lut.ndim == 3 and (lut == lut[:, :, :1]).all():
+                    # Mismo mapa en todos los canales: LUT de 1 canal (más rápida)
+                    lut = lut[:, :, 0]
+                lut = np.ascontiguousarray(lut)
+                stages.append(lambda frame, table=lut: cv2.LUT(frame, table))
+            group.clear()
+        
+        for name, kwargs in ops:
+            fn = getattr(Filters, name, None)
+            if fn is None or name.startswith("_") or name == "compile_pipeline":
+                raise ValueError(f"Filtro desconocido: {name}")
+            if name in Filters._POINTWISE_OPS:
+                group.append((fn, kwargs))
+            else:
+                flush_group()
+                stages.append(direct(fn, kwargs))
+        flush_group()
+        
+        def run(frame: np.ndarray) -> np.ndarray:
+            for stage in stages:
+                frame = stage(frame)
+            return frame
+        
+        return run
+
+
+class TemporalAverager:
+    """
+    Promedio temporal incremental sobre los últimos N frames.
+    
+    Equivale a ``Filters.temporal_filter(frames, "average")`` en un flujo en
+    vivo, pero mantiene una suma acumulada: cada frame nuevo cuesta O(H*W)
+    en lugar de apilar y promediar la ventana completa. Las sumas de uint8
+    son enteras y exactas en float32, por lo que no hay deriva, y el
+    promedio se trunca a uint8 igual que en ``temporal_filter``.
+    """
+    
+    def __init__(self, window_size: int = 5):
+        """
+        Args:
+            window_size: Número de frames de la ventana
+        """
+        self.window_size = max(1, int(window_size))
+        self.buffer: deque = deque()
+        self.accum: Optional[np.ndarray] = None
+        self._mean: Optional[np.ndarray] = None
+    
+    def push(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Añade un frame a la ventana y devuelve el promedio actual.
+        
+        Args:
+            frame: Frame uint8 (no se copia: no modificarlo mientras
+                   siga dentro de la ventana)
+            
+        Returns:
+            Frame promedio (uint8)
+        """
+        if self.accum is None or self.accum.shape != frame.shape:
+            self.reset()
+            self.accum = np.zeros(frame.shape, dtype=np.float32)
+            self._mean = np.empty(frame.shape, dtype=np.float32)
         
-        # Centrar frame redimensionado
-        y_offset = (target_h - new_h) // 2
-        x_offset = (target_w - new_w) // 2
-        canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
+        if len(self.buffer) == self.window_size:
+            np.subtract(self.accum, self.buffer.popleft(), out=self.accum)
+        self.buffer.append(frame)
+        np.add(self.accum, frame, out=self.accum)
         
-        return canvas
+        # Misma división y truncado a uint8 que temporal_filter
+        np.divide(self.accum, len(self.buffer), out=self._mean)
+        return self._mean.astype(np.uint8)
+    
+    def reset(self) -> None:
+        """Vacía la ventana."""
+        self.buffer.clear()
+        self.accum = None
@@ -4,11 +4,82 @@ Coordina la captura, procesamiento y salida de video.
 """
 
 import logging
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple
 import numpy as np
 import time
 
 
+def _with_out_buffers(processor: Callable, out_shape: Optional[Tuple[int, ...]],
+                      out_dtype) -> Callable:
+    """
+    Envuelve un procesador que acepta `out=` con dos buffers alternos.
+    
+    Los buffers se reservan en la primera llamada (con la forma del frame
+    si no se indica `out_shape`) y se alternan frame a frame, de modo que
+    el resultado devuelto sigue siendo válido hasta dos frames después.
+    
+    Args:
+        processor: Callable con firma processor(frame, out=buffer)
+        out_shape: Forma de la salida o None para usar la del frame
+        out_dtype: Tipo de la salida
+        
+    Returns:
+        Callable de un argumento que escribe en los buffers reservados
+    """
+    buffers: List[np.ndarray] = []
+    current = 0
+    
+    def run(frame: np.ndarray) -> np.ndarray:
+        nonlocal current
+        if not buffers or (out_shape is None and buffers[0].shape != frame.shape):
+            shape = out_shape if out_shape is not None else frame.shape
+            buffers[:] = [np.empty(shape, out_dtype), np.empty(shape, out_dtype)]
+        current ^= 1
+        return processor(frame, out=buffers[current])
+    
+    return run
+
+
+def _compile_chain(names: Tuple[str, ...], processors: Tuple[Callable, ...],
+                   guards: Tuple[bool, ...],
+                   on_error: Callable[[str, Exception], None]) -> Callable:
+    """
+    Genera una función que aplica una cadena fija de procesadores.
+    
+    El código se desenrolla (una asignación por etapa) y los procesadores
+    y nombres quedan ligados en el cierre, sin bucle ni desempaquetado de
+    tuplas por frame. Sólo las etapas protegidas llevan try/except.
+    
+    Args:
+        names: Nombres de las etapas
+        processors: Procesadores en orden de ejecución
+        guards: Si cada etapa captura sus errores
+        on_error: Callback (nombre, excepción) para errores de etapa
+        
+    Returns:
+        Función run(frame) -> frame procesado
+    """
+    count = len(processors)
+    params = ", ".join([f"s{i}" for i in range(count)] + [f"n{i}" for i in range(count)])
+    lines = [f"def _build({params}{', ' if count else ''}on_error):",
+             "    def run(x):"]
+    for i in range(count):
+        if not guards[i]:
+            lines.append(f"        x = s{i}(x)")
+            continue
+        lines += [
+            "        try:",
+            f"            x = s{i}(x)",
+            "        except Exception as e:",
+            f"            on_error(n{i}, e)"
+        ]
+    lines += ["        return x", "    return run"]
+    
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(lines), namespace)
+    return namespace["_build"](*processors, *names, on_error)
+
+
 class VideoPipeline:
     """
     Pipeline de procesamiento de video que coordina múltiples etapas.
@@ -16,14 +87,26 @@ class VideoPipeline:
     Permite encadenar múltiples procesadores de forma eficiente.
     """
     
-    def __init__(self, name: str = "VideoPipeline"):
+    # Intervalo mínimo (s) entre mensajes de error de una misma etapa
+    ERROR_LOG_INTERVAL = 1.0
+    
+    # Histograma de tiempos por etapa: el bin b cuenta las duraciones en
+    # [2^(b+6), 2^(b+7)) ns (el bin 0 incluye todo lo menor de 128 ns)
+    HIST_BINS = 64
+    _HIST_SHIFT = 7
+    PERCENTILES = (50, 95, 99)
+    
+    def __init__(self, name: str = "VideoPipeline", profile: bool = True):
         """
         Inicializa el pipeline de video.
         
         Args:
             name: Nombre del pipeline
+            profile: Si se mide el tiempo de cada etapa (desactivarlo deja
+                sólo el recuento de frames en las estadísticas)
         """
         self.name = name
+        self.profile = profile
         self.logger = logging.getLogger(self.__class__.__name__)
         
         self.stages = []
@@ -32,8 +115,63 @@ class VideoPipeline:
             "total_time": 0.0,
             "average_fps": 0.0
         }
+        # Tiempo total acumulado en ns (entero, exacto)
+        self._total_ns = 0
+        # Tiempos por etapa como estructura de arrays (índice = posición
+        # en self.stages): ns acumulados y frames procesados
+        self._exec_ns: List[int] = []
+        self._counts: List[int] = []
+        # Histograma log2 de duraciones por etapa (HIST_BINS contadores)
+        self._hist: List[List[int]] = []
+        # Plan de ejecución: (índice, nombre, procesador) de las etapas
+        # habilitadas; se reconstruye sólo al cambiar etapas
+        self._enabled_plan: List[Tuple[int, str, Callable]] = []
+        # Cadena compacta (nombre, procesador) para el camino sin perfilado
+        self._hot_chain: Tuple[Tuple[str, Callable], ...] = ()
+        # Cadena generada por freeze() (None si el pipeline no está congelado)
+        self._frozen = False
+        self._fused: Optional[Callable] = None
+        # Limitación de errores por etapa: nombre -> [último log, omitidos]
+        self._error_log: Dict[str, list] = {}
+        # Etapas añadidas con guard=False (sus errores se propagan)
+        self._unguarded: set = set()
+    
+    def _rebuild_plan(self) -> None:
+        """Recalcula el plan de etapas habilitadas."""
+        self._enabled_plan = [
+            (idx, stage["name"], stage["call"])
+            for idx, stage in enumerate(self.stages) if stage["enabled"]
+        ]
+        self._hot_chain = tuple((name, call) for _, name, call in self._enabled_plan)
+        if self._frozen:
+            self._fused = _compile_chain(
+                tuple(name for name, _ in self._hot_chain),
+                tuple(call for _, call in self._hot_chain),
+                tuple(name not in self._unguarded for name, _ in self._hot_chain),
+                self._log_stage_error
+            )
+    
+    def freeze(self) -> None:
+        """
+        Especializa el pipeline para su cadena actual de etapas.
+        
+        Genera una función desenrollada con las etapas habilitadas que usa
+        el camino sin perfilado (profile=False). Si después se añaden o
+        (des)habilitan etapas, la función se regenera automáticamente.
+        """
+        self._frozen = True
+        self._rebuild_plan()
+        self.logger.info(f"Pipeline congelado con {len(self._hot_chain)} etapas")
+    
+    def unfreeze(self) -> None:
+        """Vuelve al bucle genérico sobre las etapas."""
+        self._frozen = False
+        self._fused = None
     
-    def add_stage(self, name: str, processor: Callable, enabled: bool = True) -> None:
+    def add_stage(self, name: str, processor: Callable, enabled: bool = True,
+                  in_place: bool = False,
+                  out_shape: Optional[Tuple[int, ...]] = None,
+                  out_dtype=np.uint8, guard: bool = True) -> None:
         """
         Añade una etapa al pipeline.
         
@@ -41,14 +179,27 @@ class VideoPipeline:
             name: Nombre de la etapa
             processor: Función o callable que procesa el frame
             enabled: Si la etapa está habilitada
+            in_place: Si el procesador acepta `out=` y debe escribir en
+                buffers preasignados en lugar de crear un array por frame
+            out_shape: Forma de la salida (None = la del frame de entrada)
+            out_dtype: Tipo de la salida cuando in_place=True
+            guard: Si un error en la etapa se registra y se continúa con el
+                frame sin procesar; con False la excepción se propaga
         """
+        call = _with_out_buffers(processor, out_shape, out_dtype) if in_place else processor
         self.stages.append({
             "name": name,
             "processor": processor,
+            "call": call,
             "enabled": enabled,
-            "execution_time": 0.0,
-            "frame_count": 0
+            "guard": guard
         })
+        if not guard:
+            self._unguarded.add(name)
+        self._exec_ns.append(0)
+        self._counts.append(0)
+        self._hist.append([0] * self.HIST_BINS)
+        self._rebuild_plan()
         self.logger.info(f"Etapa añadida: {name}")
     
     def process_frame(self, frame: np.ndarray) -> np.ndarray:
@@ -61,36 +212,103 @@ class VideoPipeline:
         Returns:
             Frame procesado
         """
-        start_time = time.time()
+        if not self.profile:
+            return self._process_frame_fast(frame)
+        
+        clock = time.perf_counter_ns
+        start_ns = clock()
         
         result = frame
         
-        for stage in self.stages:
-            if not stage["enabled"]:
-                continue
-            
+        exec_ns = self._exec_ns
+        counts = self._counts
+        hist = self._hist
+        shift = self._HIST_SHIFT
+        t0 = start_ns
+        for idx, name, processor in self._enabled_plan:
             try:
-                stage_start = time.time()
-                result = stage["processor"](result)
-                stage_time = time.time() - stage_start
-                
-                stage["execution_time"] += stage_time
-                stage["frame_count"] += 1
+                result = processor(result)
+                t1 = clock()
+                dt = t1 - t0
+                exec_ns[idx] += dt
+                counts[idx] += 1
+                # bit_length() = floor(log2(dt)) + 1; nunca supera 64 bins
+                b = dt.bit_length() - shift
+                hist[idx][b if b > 0 else 0] += 1
+                t0 = t1
                 
             except Exception as e:
-                self.logger.error(f"Error en etapa {stage['name']}: {e}")
+                # Sólo se consulta en el camino de error: sin coste por frame
+                if name in self._unguarded:
+                    raise
+                self._log_stage_error(name, e)
                 # Continuar con el frame sin procesar de esta etapa
+                t0 = clock()
         
-        # Actualizar estadísticas globales
-        total_time = time.time() - start_time
+        # Actualizar estadísticas globales (en segundos sólo al reportar)
+        self._total_ns += clock() - start_ns
         self.stats["frames_processed"] += 1
-        self.stats["total_time"] += total_time
         
-        if self.stats["total_time"] > 0:
-            self.stats["average_fps"] = self.stats["frames_processed"] / self.stats["total_time"]
+        return result
+    
+    def _process_frame_fast(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Procesa un frame sin medir tiempos por etapa.
         
+        Args:
+            frame: Frame de entrada
+            
+        Returns:
+            Frame procesado
+        """
+        fused = self._fused
+        if fused is not None:
+            result = fused(frame)
+        else:
+            result = frame
+            for name, processor in self._hot_chain:
+                try:
+                    result = processor(result)
+                except Exception as e:
+                    if name in self._unguarded:
+                        raise
+                    self._log_stage_error(name, e)
+        
+        self.stats["frames_processed"] += 1
         return result
     
+    def _log_stage_error(self, name: str, error: Exception) -> None:
+        """
+        Registra el error de una etapa, como mucho una vez por intervalo.
+        
+        Una etapa que falla en cada frame inundaría el log y reduciría los
+        FPS; los errores omitidos se cuentan y se indican en el siguiente.
+        
+        Args:
+            name: Nombre de la etapa
+            error: Excepción capturada
+        """
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
+        
+        now = time.perf_counter_ns()
+        interval_ns = int(self.ERROR_LOG_INTERVAL * 1e9)
+        entry = self._error_log.get(name)
+        if entry is None:
+            entry = self._error_log[name] = [now - interval_ns, 0]
+        
+        if now - entry[0] < interval_ns:
+            entry[1] += 1
+            return
+        
+        if entry[1]:
+            self.logger.error("Error en etapa %s: %s (%d errores omitidos)",
+                              name, error, entry[1])
+        else:
+            self.logger.error("Error en etapa %s: %s", name, error)
+        entry[0] = now
+        entry[1] = 0
+    
     def enable_stage(self, name: str) -> bool:
         """
         Habilita una etapa del pipeline.
@@ -104,6 +322,7 @@ class VideoPipeline:
         for stage in self.stages:
             if stage["name"] == name:
                 stage["enabled"] = True
+                self._rebuild_plan()
                 self.logger.info(f"Etapa habilitada: {name}")
                 return True
         return False
@@ -121,6 +340,7 @@ class VideoPipeline:
         for stage in self.stages:
             if stage["name"] == name:
                 stage["enabled"] = False
+                self._rebuild_plan()
                 self.logger.info(f"Etapa deshabilitada: {name}")
                 return True
         return False
@@ -132,18 +352,31 @@ class VideoPipeline:
         Returns:
             Diccionario con estadísticas
         """
+        total_ns = self._total_ns
+        self.stats["total_time"] = total_ns / 1e9
+        if total_ns > 0:
+            self.stats["average_fps"] = self.stats["frames_processed"] * 1e9 / total_ns
+        
+        # Medias y porcentajes de todas las etapas en dos divisiones
+        exec_ns = np.asarray(self._exec_ns, dtype=np.float64)
+        counts = np.asarray(self._counts, dtype=np.int64)
+        avg_ms = exec_ns / np.maximum(counts, 1) / 1e6
+        pct = exec_ns / total_ns * 100 if total_ns > 0 else np.zeros_like(exec_ns)
+        tails = self._percentiles_ms(counts)
+        
         stage_stats = []
-        for stage in self.stages:
-            if stage["frame_count"] > 0:
-                avg_time = stage["execution_time"] / stage["frame_count"]
-                stage_stats.append({
+        for idx, (stage, count, avg, p) in enumerate(zip(self.stages, counts, avg_ms, pct)):
+            if count > 0:
+                entry = {
                     "name": stage["name"],
                     "enabled": stage["enabled"],
-                    "frames_processed": stage["frame_count"],
-                    "average_time_ms": avg_time * 1000,
-                    "percentage": (stage["execution_time"] / self.stats["total_time"]) * 100
-                        if self.stats["total_time"] > 0 else 0
-                })
+                    "frames_processed": int(count),
+                    "average_time_ms": float(avg),
+                    "percentage": float(p)
+                }
+                for q, values in tails.items():
+                    entry[f"p{q}_time_ms"] = float(values[idx])
+                stage_stats.append(entry)
         
         return {
             "pipeline_name": self.name,
@@ -152,6 +385,31 @@ class VideoPipeline:
             "stages": stage_stats
         }
     
+    def _percentiles_ms(self, counts: np.ndarray) -> Dict[int, np.ndarray]:
+        """
+        Estima los percentiles de tiempo de cada etapa desde su histograma.
+        
+        Se devuelve el límite superior del bin donde cae cada percentil, es
+        decir, una cota con resolución de factor 2.
+        
+        Args:
+            counts: Frames procesados por etapa
+            
+        Returns:
+            Diccionario percentil -> array de tiempos (ms) por etapa
+        """
+        if not self._hist:
+            return {q: np.zeros(0) for q in self.PERCENTILES}
+        
+        cumulative = np.cumsum(np.asarray(self._hist, dtype=np.int64), axis=1)
+        upper_ms = np.exp2(np.arange(self.HIST_BINS) + self._HIST_SHIFT) / 1e6
+        
+        tails = {}
+        for q in self.PERCENTILES:
+            target = counts[:, None] * (q / 100)
+            tails[q] = upper_ms[np.argmax(cumulative >= target, axis=1)]
+        return tails
+    
     def reset_stats(self) -> None:
         """Reinicia las estadísticas del pipeline."""
         self.stats = {
@@ -159,15 +417,18 @@ class VideoPipeline:
             "total_time": 0.0,
             "average_fps": 0.0
         }
-        
-        for stage in self.stages:
-            stage["execution_time"] = 0.0
-            stage["frame_count"] = 0
+        self._total_ns = 0
+        self._exec_ns = [0] * len(self.stages)
+        self._counts = [0] * len(self.stages)
+        self._hist = [[0] * self.HIST_BINS for _ in self.stages]
         
         self.logger.info("Estadísticas reiniciadas")
     
     def clear_stages(self) -> None:
         """Elimina todas las etapas del pipeline."""
         self.stages.clear()
+        self._error_log.clear()
+        self._unguarded.clear()
+        self._rebuild_plan()
         self.reset_stats()
         self.logger.info("Pipeline limpiado")
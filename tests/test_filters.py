@@ -0,0 +1,24 @@
+"""
+Pruebas de los filtros de procesamiento.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from processing.filters import Filters, TemporalAverager
+
+
+def test_temporal_averager_matches_temporal_filter():
+    """El promedio incremental coincide con temporal_filter en cada frame."""
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (8, 8, 3), dtype=np.uint8) for _ in range(10)]
+
+    averager = TemporalAverager(window_size=3)
+    for i, frame in enumerate(frames):
+        window = frames[max(0, i - 2):i + 1]
+        expected = Filters.temporal_filter(window, "average")
+        np.testing.assert_array_equal(averager.push(frame), expected)
@@ -2,17 +2,71 @@
 DeviceDetector - Detecta dispositivos conectados al sistema.
 """
 
+import os
+import errno
+import importlib.util
+import struct
 import subprocess
 import logging
-from typing import List, Dict, Any
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional
 import platform
 
+try:
+    import fcntl  # sólo POSIX; el sondeo I2C únicamente se usa en Linux
+except ImportError:
+    fcntl = None
+
+# OpenCV se importa sólo al sondear cámaras (_get_cv2); cargarlo cuesta
+# cientos de ms y no hace falta para la info de sistema, USB, I2C o GPIO
+_cv2 = None
+
 
 class DeviceDetector:
     """
     Detector de dispositivos hardware conectados al sistema.
     """
     
+    # Tiempo máximo total para sondear las cámaras V4L2 en paralelo (s)
+    CAMERA_PROBE_TIMEOUT = 3.0
+    
+    # Directorio sysfs con los dispositivos USB enumerados por el kernel
+    USB_SYSFS_DIR = "/sys/bus/usb/devices"
+    
+    # Nodos de vídeo V4L2 y los ioctl de consulta (sólo lectura: no
+    # capturan ni cambian el formato). v4l2_format mide 208 bytes con
+    # punteros de 64 bits y 204 con 32; su unión empieza alineada a 8/4
+    V4L2_SYSFS_DIR = "/sys/class/video4linux"
+    _PTR64 = struct.calcsize("P") == 8
+    _VIDIOC_QUERYCAP = 0x80685600
+    _VIDIOC_G_FMT = 0xC0D05604 if _PTR64 else 0xC0CC5604
+    _VIDIOC_G_PARM = 0xC0CC5615
+    _V4L2_FMT_SIZE = 208 if _PTR64 else 204
+    _V4L2_PIX_OFFSET = 8 if _PTR64 else 4
+    _V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+    _V4L2_CAP_DEVICE_CAPS = 0x80000000
+    _V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+    
+    # ioctl de i2c-dev (I2C_SLAVE, I2C_FUNCS, I2C_SMBUS) y rango de
+    # direcciones que sondea i2cdetect
+    _I2C_SLAVE = 0x0703
+    _I2C_FUNCS = 0x0705
+    _I2C_SMBUS = 0x0720
+    _I2C_FUNC_SMBUS_QUICK = 0x00010000
+    _I2C_PROBE_RANGE = range(0x03, 0x78)
+    # i2c_smbus_ioctl_data para un quick write (read_write=0, size=0, data=NULL)
+    _I2C_SMBUS_QUICK_WRITE = struct.pack("@BBIP", 0, 0, 0, 0)
+    # Errores con los que un adaptador indica que nadie respondió (NACK)
+    _I2C_NO_DEVICE_ERRNOS = frozenset(
+        (errno.ENXIO, errno.EREMOTEIO, errno.EIO, errno.ETIMEDOUT, errno.EAGAIN)
+    )
+    
+    # Datos que no cambian durante la ejecución; se calculan una sola vez
+    # por proceso (platform.processor() lanza `uname -p` en Linux)
+    _jetson: Optional[bool] = None
+    _platform_info: Optional[Dict[str, str]] = None
+    
     def __init__(self):
         """Inicializa el detector de dispositivos."""
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -47,24 +101,14 @@ class DeviceDetector:
         cameras = []
         
         try:
-            import cv2
-            
-            # Detectar cámaras USB (V4L2)
-            for i in range(10):
-                cap = cv2.VideoCapture(i)
-                if cap.isOpened():
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    fps = int(cap.get(cv2.CAP_PROP_FPS))
-                    
-                    cameras.append({
-                        "type": "usb",
-                        "id": i,
-                        "device": f"/dev/video{i}",
-                        "resolution": f"{width}x{height}",
-                        "fps": fps
-                    })
-                    cap.release()
+            # Detectar cámaras USB (V4L2): en Linux se consultan los nodos
+            # con ioctl sin abrir capturas; si no hay sysfs, con OpenCV
+            v4l2_cameras = None
+            if self.system == "Linux" and fcntl is not None:
+                v4l2_cameras = self._query_v4l2_cameras()
+            if v4l2_cameras is None:
+                v4l2_cameras = self._probe_cameras_cv2()
+            cameras.extend(v4l2_cameras)
             
             # Detectar cámaras CSI (Jetson)
             if self._is_jetson():
@@ -84,6 +128,173 @@ class DeviceDetector:
         
         return cameras
     
+    def _query_v4l2_cameras(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Enumera las cámaras V4L2 desde sysfs y las consulta con ioctl.
+        
+        Sólo se usan VIDIOC_QUERYCAP, VIDIOC_G_FMT y VIDIOC_G_PARM, que no
+        inician captura ni alteran el dispositivo; los nodos sin capacidad
+        de captura (p. ej. los de metadatos de UVC) se descartan.
+        
+        Returns:
+            Lista de cámaras o None si no existe /sys/class/video4linux
+        """
+        try:
+            with os.scandir(self.V4L2_SYSFS_DIR) as entries:
+                names = [entry.name for entry in entries
+                         if entry.name.startswith("video")
+                         and entry.name[len("video"):].isdigit()]
+        except FileNotFoundError:
+            return None
+        
+        cameras = []
+        for name in sorted(names, key=lambda n: int(n[len("video"):])):
+            index = int(name[len("video"):])
+            try:
+                camera = self._query_v4l2_node(index)
+            except OSError as e:
+                self.logger.debug(f"No se pudo consultar /dev/{name}: {e}")
+                continue
+            
+            if camera is not None:
+                camera["name"] = self._read_sysfs_attr(
+                    f"{self.V4L2_SYSFS_DIR}/{name}", "name") or camera["card"]
+                cameras.append(camera)
+        
+        return cameras
+    
+    def _query_v4l2_node(self, index: int) -> Optional[Dict[str, Any]]:
+        """
+        Lee capacidades, formato actual y FPS de un nodo /dev/videoN.
+        
+        Args:
+            index: Número del nodo
+            
+        Returns:
+            Información de la cámara o None si el nodo no captura vídeo
+        """
+        device = f"/dev/video{index}"
+        fd = os.open(device, os.O_RDWR | os.O_NONBLOCK)
+        try:
+            cap = bytearray(104)
+            fcntl.ioctl(fd, self._VIDIOC_QUERYCAP, cap)
+            driver, card = (
+                bytes(field).split(b"\0", 1)[0].decode(errors="replace")
+                for field in (cap[0:16], cap[16:48])
+            )
+            capabilities, device_caps = struct.unpack_from("=II", cap, 84)
+            if capabilities & self._V4L2_CAP_DEVICE_CAPS:
+                capabilities = device_caps
+            if not capabilities & self._V4L2_CAP_VIDEO_CAPTURE:
+                return None
+            
+            fmt = bytearray(self._V4L2_FMT_SIZE)
+            struct.pack_into("=I", fmt, 0, self._V4L2_BUF_TYPE_VIDEO_CAPTURE)
+            fcntl.ioctl(fd, self._VIDIOC_G_FMT, fmt)
+            width, height = struct.unpack_from("=II", fmt, self._V4L2_PIX_OFFSET)
+            
+            fps = 0
+            parm = bytearray(204)
+            struct.pack_into("=I", parm, 0, self._V4L2_BUF_TYPE_VIDEO_CAPTURE)
+            try:
+                fcntl.ioctl(fd, self._VIDIOC_G_PARM, parm)
+                numerator, denominator = struct.unpack_from("=II", parm, 12)
+                if numerator:
+                    fps = round(denominator / numerator)
+            except OSError:
+                pass  # Algunos drivers no implementan G_PARM
+        finally:
+            os.close(fd)
+        
+        return {
+            "type": "usb",
+            "id": index,
+            "device": device,
+            "resolution": f"{width}x{height}",
+            "fps": fps,
+            "driver": driver,
+            "card": card
+        }
+    
+    def _probe_cameras_cv2(self) -> List[Dict[str, Any]]:
+        """
+        Detecta cámaras abriéndolas con OpenCV (sin V4L2 en sysfs).
+        
+        Returns:
+            Lista de cámaras detectadas
+        """
+        cv2 = self._get_cv2()
+        cameras = []
+        
+        # En Linux sólo se abren los nodos /dev/videoN existentes; la
+        # apertura (que libera el GIL) se hace en paralelo porque cada
+        # intento puede bloquear cientos de ms
+        indices = list(range(10))
+        if self.system == "Linux":
+            indices = [i for i in indices if os.path.exists(f"/dev/video{i}")]
+        
+        if indices:
+            pool = ThreadPoolExecutor(max_workers=len(indices))
+            try:
+                futures = [pool.submit(self._probe_camera, cv2, i) for i in indices]
+                done, pending = wait(futures, timeout=self.CAMERA_PROBE_TIMEOUT)
+                for index, future in zip(indices, futures):  # orden por índice
+                    if future not in done:
+                        continue
+                    error = future.exception()
+                    if error is not None:
+                        self.logger.debug(f"No se pudo sondear la cámara {index}: {error}")
+                    elif future.result() is not None:
+                        cameras.append(future.result())
+                if pending:
+                    self.logger.warning(f"{len(pending)} cámaras no respondieron a tiempo")
+            finally:
+                pool.shutdown(wait=False)
+        
+        return cameras
+    
+    @staticmethod
+    def _get_cv2():
+        """
+        Importa OpenCV la primera vez que se necesita.
+        
+        Returns:
+            Módulo cv2
+        """
+        global _cv2
+        if _cv2 is None:
+            import cv2
+            _cv2 = cv2
+        return _cv2
+    
+    def _probe_camera(self, cv2, index: int) -> Optional[Dict[str, Any]]:
+        """
+        Abre una cámara V4L2 y lee sus propiedades.
+        
+        Args:
+            cv2: Módulo OpenCV
+            index: Índice de la cámara
+            
+        Returns:
+            Información de la cámara o None si no se pudo abrir
+        """
+        cap = cv2.VideoCapture(index)
+        try:
+            if not cap.isOpened():
+                return None
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fps = int(cap.get(cv2.CAP_PROP_FPS))
+            return {
+                "type": "usb",
+                "id": index,
+                "device": f"/dev/video{index}",
+                "resolution": f"{width}x{height}",
+                "fps": fps
+            }
+        finally:
+            cap.release()
+    
     def detect_usb_devices(self) -> List[Dict[str, Any]]:
         """
         Detecta dispositivos USB conectados.
@@ -95,17 +306,10 @@ class DeviceDetector:
         
         try:
             if self.system == "Linux":
-                result = subprocess.run(
-                    ["lsusb"],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                
-                if result.returncode == 0:
-                    for line in result.stdout.strip().split('\n'):
-                        if line:
-                            devices.append({"info": line})
+                if os.path.isdir(self.USB_SYSFS_DIR):
+                    devices = self._read_usb_sysfs()
+                else:
+                    devices = self._run_lsusb()
             
             self.logger.info(f"Detectados {len(devices)} dispositivos USB")
             
@@ -114,6 +318,91 @@ class DeviceDetector:
         
         return devices
     
+    def _read_usb_sysfs(self) -> List[Dict[str, Any]]:
+        """
+        Enumera los dispositivos USB leyendo sysfs directamente.
+        
+        Returns:
+            Lista de dispositivos USB con el mismo texto "info" que lsusb
+        """
+        devices = []
+        read_attr = self._read_sysfs_attr
+        
+        with os.scandir(self.USB_SYSFS_DIR) as entries:
+            paths = [entry.path for entry in entries if ":" not in entry.name]
+        
+        for path in paths:
+            # Las interfaces ("1-1:1.0") ya se descartan por nombre; los
+            # enlaces sin idVendor no son dispositivos
+            vendor = read_attr(path, "idVendor")
+            if vendor is None:
+                continue
+            
+            product_id = read_attr(path, "idProduct") or "0000"
+            bus = int(read_attr(path, "busnum") or 0)
+            dev = int(read_attr(path, "devnum") or 0)
+            name = " ".join(filter(None, (
+                read_attr(path, "manufacturer"),
+                read_attr(path, "product")
+            )))
+            
+            devices.append({
+                "info": f"Bus {bus:03d} Device {dev:03d}: ID {vendor}:{product_id} {name}".rstrip(),
+                "bus": bus,
+                "device": dev,
+                "vendor_id": vendor,
+                "product_id": product_id,
+                "name": name
+            })
+        
+        devices.sort(key=lambda d: (d["bus"], d["device"]))
+        return devices
+    
+    @staticmethod
+    def _read_sysfs_attr(device_path: str, attr: str) -> Optional[str]:
+        """
+        Lee un atributo de sysfs.
+        
+        Args:
+            device_path: Directorio del dispositivo
+            attr: Nombre del atributo
+            
+        Returns:
+            Valor sin espacios finales o None si no existe
+        """
+        try:
+            # Los atributos son páginas pequeñas: una sola lectura basta
+            with open(f"{device_path}/{attr}", "rb", buffering=0) as f:
+                return f.read(256).decode(errors="replace").strip()
+        except OSError:
+            return None
+    
+    def _run_lsusb(self) -> List[Dict[str, Any]]:
+        """
+        Enumera los dispositivos USB con lsusb (sin sysfs disponible).
+        
+        Returns:
+            Lista de dispositivos USB
+        """
+        # communicate() respeta el timeout aunque lsusb se cuelgue sin
+        # cerrar el pipe; al vencer se mata el proceso
+        with subprocess.Popen(["lsusb"], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL) as proc:
+            try:
+                out, _ = proc.communicate(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                raise
+            returncode = proc.returncode
+        
+        devices = [
+            {"info": line.rstrip().decode("utf-8", "replace")}
+            for line in out.splitlines()
+            if line.strip()
+        ]
+        
+        return devices if returncode == 0 else []
+    
     def detect_i2c_devices(self) -> List[Dict[str, Any]]:
         """
         Detecta dispositivos I2C conectados.
@@ -125,26 +414,23 @@ class DeviceDetector:
         
         try:
             if self.system == "Linux":
-                # Intentar con i2cdetect
-                for bus in range(8):
+                buses = sorted(
+                    int(path.name[len("i2c-"):])
+                    for path in Path("/dev").glob("i2c-*")
+                    if path.name[len("i2c-"):].isdigit()
+                )
+                for bus in buses:
                     try:
-                        result = subprocess.run(
-                            ["i2cdetect", "-y", str(bus)],
-                            capture_output=True,
-                            text=True,
-                            timeout=2
-                        )
-                        
-                        if result.returncode == 0:
-                            # Parsear salida de i2cdetect
-                            addresses = self._parse_i2cdetect(result.stdout)
-                            if addresses:
-                                devices.append({
-                                    "bus": bus,
-                                    "addresses": addresses
-                                })
-                    except (subprocess.TimeoutExpired, FileNotFoundError):
-                        pass
+                        addresses = self._probe_i2c_bus(bus)
+                    except OSError as e:
+                        self.logger.debug(f"No se pudo sondear /dev/i2c-{bus}: {e}")
+                        continue
+                    
+                    if addresses:
+                        devices.append({
+                            "bus": bus,
+                            "addresses": addresses
+                        })
             
             self.logger.info(f"Detectados dispositivos I2C en {len(devices)} buses")
             
@@ -160,20 +446,29 @@ class DeviceDetector:
         Returns:
             True si GPIO está disponible
         """
-        try:
-            if self._is_jetson():
-                import Jetson.GPIO as GPIO
-                return True
-        except ImportError:
-            pass
-        
-        try:
-            import RPi.GPIO as GPIO
+        # Sólo se comprueba que el paquete existe: importarlo tiene efectos
+        # secundarios (acceso a /dev/mem, RuntimeError fuera de la placa)
+        if self._is_jetson() and self._module_available("Jetson.GPIO"):
             return True
-        except ImportError:
-            pass
         
-        return False
+        return self._module_available("RPi.GPIO")
+    
+    @staticmethod
+    def _module_available(name: str) -> bool:
+        """
+        Comprueba si un módulo se puede importar sin llegar a importarlo.
+        
+        Args:
+            name: Nombre completo del módulo
+            
+        Returns:
+            True si el módulo está instalado
+        """
+        try:
+            return importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            # El paquete padre no existe
+            return False
     
     def get_system_info(self) -> Dict[str, Any]:
         """
@@ -182,12 +477,14 @@ class DeviceDetector:
         Returns:
             Diccionario con información del sistema
         """
-        info = {
-            "platform": platform.system(),
-            "machine": platform.machine(),
-            "processor": platform.processor(),
-            "python_version": platform.python_version()
-        }
+        if DeviceDetector._platform_info is None:
+            DeviceDetector._platform_info = {
+                "platform": platform.system(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "python_version": platform.python_version()
+            }
+        info = dict(self._platform_info)
         
         # Información específica de Jetson
         if self._is_jetson():
@@ -202,11 +499,13 @@ class DeviceDetector:
         Returns:
             True si es Jetson
         """
-        try:
-            with open("/etc/nv_tegra_release", "r") as f:
-                return "tegra" in f.read().lower()
-        except FileNotFoundError:
-            return False
+        if DeviceDetector._jetson is None:
+            try:
+                with open("/etc/nv_tegra_release", "r") as f:
+                    DeviceDetector._jetson = "tegra" in f.read().lower()
+            except FileNotFoundError:
+                DeviceDetector._jetson = False
+        return DeviceDetector._jetson
     
     def _get_jetson_info(self) -> Dict[str, str]:
         """
@@ -251,7 +550,7 @@ class DeviceDetector:
             True si la cámara está disponible
         """
         try:
-            import cv2
+            cv2 = self._get_cv2()
             pipeline = (
                 f"nvarguscamerasrc sensor-id={sensor_id} num-buffers=1 ! "
                 "video/x-raw(memory:NVMM), width=640, height=480, format=NV12 ! "
@@ -265,24 +564,55 @@ class DeviceDetector:
         except Exception:
             return False
     
-    def _parse_i2cdetect(self, output: str) -> List[str]:
+    def _probe_i2c_bus(self, bus: int) -> List[str]:
         """
-        Parsea la salida de i2cdetect.
+        Sondea un bus I2C como i2cdetect, sin lanzar procesos.
+        
+        Usa lectura de un byte en los rangos de EEPROM y quick write SMBus en
+        el resto, igual que el modo automático de i2cdetect. Si el adaptador
+        no admite quick write (p. ej. i2c-tegra en Jetson) se lee un byte en
+        todas las direcciones.
         
         Args:
-            output: Salida del comando
+            bus: Número de bus (/dev/i2c-N)
             
         Returns:
-            Lista de direcciones detectadas
+            Lista de direcciones detectadas ("UU" si las usa un driver)
         """
         addresses = []
+        skipped = []
+        fd = os.open(f"/dev/i2c-{bus}", os.O_RDWR)
+        try:
+            try:
+                funcs = struct.unpack(
+                    "@L", fcntl.ioctl(fd, self._I2C_FUNCS, bytes(struct.calcsize("@L")))
+                )[0]
+            except OSError:
+                funcs = 0
+            quick = bool(funcs & self._I2C_FUNC_SMBUS_QUICK)
+            
+            for addr in self._I2C_PROBE_RANGE:
+                try:
+                    fcntl.ioctl(fd, self._I2C_SLAVE, addr)
+                except OSError as e:
+                    if e.errno == errno.EBUSY:
+                        addresses.append("UU")
+                    continue
+                
+                try:
+                    if not quick or 0x30 <= addr <= 0x37 or 0x50 <= addr <= 0x5F:
+                        os.read(fd, 1)
+                    else:
+                        fcntl.ioctl(fd, self._I2C_SMBUS, self._I2C_SMBUS_QUICK_WRITE)
+                except OSError as e:
+                    if e.errno not in self._I2C_NO_DEVICE_ERRNOS:
+                        skipped.append(f"{addr:02x} ({errno.errorcode.get(e.errno, e.errno)})")
+                    continue
+                addresses.append(f"{addr:02x}")
+        finally:
+            os.close(fd)
         
-        for line in output.split('\n'):
-            # Buscar líneas con direcciones (contienen :)
-            if ':' in line:
-                parts = line.split(':')[1].strip().split()
-                for part in parts:
-                    if part != '--' and len(part) == 2:
-                        addresses.append(part)
+        if skipped:
+            self.logger.debug(f"Direcciones no sondeables en /dev/i2c-{bus}: {', '.join(skipped)}")
         
         return addresses
@@ -3,9 +3,51 @@ FPSCounter - Contador de frames por segundo.
 """
 
 import time
-from collections import deque
+from array import array
 from typing import Optional
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _window_frame_times(ring, head: int, filled: int):
+    """
+    Recorre la ventana del anillo en orden cronológico.
+    
+    Args:
+        ring: Anillo de marcas perf_counter_ns
+        head: Siguiente posición a escribir
+        filled: Marcas válidas en el anillo
+        
+    Returns:
+        (media, mínimo, máximo) del tiempo entre frames en ms
+    """
+    if filled < 2:
+        return 0.0, 0.0, 0.0
+    
+    size = len(ring)
+    start = head if filled == size else 0
+    prev = ring[start]
+    lo = hi = -1
+    for k in range(1, filled):
+        current = ring[(start + k) % size]
+        dt = current - prev
+        if lo < 0 or dt < lo:
+            lo = dt
+        if dt > hi:
+            hi = dt
+        prev = current
+    
+    mean = (prev - ring[start]) / (filled - 1)
+    return mean / 1e6, lo / 1e6, hi / 1e6
+
+
+if NUMBA_AVAILABLE:
+    _window_frame_times = njit(cache=True)(_window_frame_times)
+
 
 class FPSCounter:
     """
@@ -20,10 +62,17 @@ class FPSCounter:
             buffer_size: Tamaño del buffer para promediado
         """
         self.buffer_size = buffer_size
-        self.timestamps = deque(maxlen=buffer_size)
+        # Anillo preasignado de marcas perf_counter_ns (int64 sin boxing);
+        # _head es la siguiente posición a escribir
+        self._ring = array("q", bytes(8 * buffer_size))
+        self._head = 0
         self.frame_count = 0
-        self.start_time = time.time()
-        self.last_time = self.start_time
+        # perf_counter_ns: monotónico (time.time puede retroceder con NTP)
+        # y entero, sin error de redondeo acumulado
+        self._start_ns = time.perf_counter_ns()
+        # FPS y duración del último frame, calculados una vez por tick
+        self._fps = 0.0
+        self._last_dt_ns = 0
     
     def tick(self) -> float:
         """
@@ -32,12 +81,32 @@ class FPSCounter:
         Returns:
             FPS actual
         """
-        current_time = time.time()
-        self.timestamps.append(current_time)
-        self.frame_count += 1
-        self.last_time = current_time
+        now_ns = time.perf_counter_ns()
+        ring = self._ring
+        size = self.buffer_size
+        head = self._head
+        count = self.frame_count
+        
+        if count:
+            self._last_dt_ns = now_ns - ring[head - 1]
+        ring[head] = now_ns
+        head += 1
+        if head == size:
+            head = 0
+        self._head = head
+        count += 1
+        self.frame_count = count
         
-        return self.get_fps()
+        # FPS basado en el buffer: con el anillo lleno, el más antiguo es
+        # el siguiente a sobrescribir; si no, el primero escrito
+        if count >= size:
+            n = size
+            time_diff = now_ns - ring[head]
+        else:
+            n = count
+            time_diff = now_ns - ring[0]
+        self._fps = (n - 1) * 1e9 / time_diff if time_diff > 0 else 0.0
+        return self._fps
     
     def get_fps(self) -> float:
         """
@@ -46,16 +115,7 @@ class FPSCounter:
         Returns:
             FPS promediado
         """
-        if len(self.timestamps) < 2:
-            return 0.0
-        
-        # Calcular FPS basado en el buffer
-        time_diff = self.timestamps[-1] - self.timestamps[0]
-        
-        if time_diff > 0:
-            return (len(self.timestamps) - 1) / time_diff
-        
-        return 0.0
+        return self._fps
     
     def get_average_fps(self) -> float:
         """
@@ -64,7 +124,7 @@ class FPSCounter:
         Returns:
             FPS promedio total
         """
-        elapsed = time.time() - self.start_time
+        elapsed = (time.perf_counter_ns() - self._start_ns) / 1e9
         
         if elapsed > 0:
             return self.frame_count / elapsed
@@ -78,17 +138,15 @@ class FPSCounter:
         Returns:
             Tiempo del frame en ms
         """
-        if len(self.timestamps) < 2:
-            return 0.0
-        
-        return (self.timestamps[-1] - self.timestamps[-2]) * 1000
+        return self._last_dt_ns / 1e6
     
     def reset(self) -> None:
         """Reinicia el contador."""
-        self.timestamps.clear()
+        self._head = 0
         self.frame_count = 0
-        self.start_time = time.time()
-        self.last_time = self.start_time
+        self._start_ns = time.perf_counter_ns()
+        self._fps = 0.0
+        self._last_dt_ns = 0
     
     def get_stats(self) -> dict:
         """
@@ -97,10 +155,15 @@ class FPSCounter:
         Returns:
             Diccionario con estadísticas
         """
+        filled = min(self.frame_count, self.buffer_size)
+        _, min_ms, max_ms = _window_frame_times(self._ring, self._head, filled)
+        
         return {
             "current_fps": self.get_fps(),
             "average_fps": self.get_average_fps(),
             "frame_count": self.frame_count,
             "frame_time_ms": self.get_frame_time(),
-            "elapsed_time": time.time() - self.start_time
+            "min_frame_time_ms": min_ms,
+            "max_frame_time_ms": max_ms,
+            "elapsed_time": (time.perf_counter_ns() - self._start_ns) / 1e9
         }
@@ -2,11 +2,14 @@
 Logger - Sistema de logging configurado para el proyecto.
 """
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Set
 
 try:
     import colorlog
@@ -14,36 +17,37 @@ try:
 except ImportError:
     COLORLOG_AVAILABLE = False
 
+# Nombres de loggers ya configurados (atajo para get_logger)
+_CONFIGURED: Set[str] = set()
 
-def setup_logger(name: str = "PureVision", level: int = logging.INFO,
-                log_to_file: bool = True, log_dir: str = "logs") -> logging.Logger:
+# Hilos que escriben los logs a archivo (uno por archivo)
+_LISTENERS: List[QueueListener] = []
+
+
+def _stop_listeners() -> None:
+    """Vacía las colas pendientes y detiene los hilos de escritura."""
+    for listener in _LISTENERS:
+        listener.stop()
+    _LISTENERS.clear()
+
+
+atexit.register(_stop_listeners)
+
+
+def _build_console_formatter() -> logging.Formatter:
     """
-    Configura y retorna un logger para el proyecto.
+    Crea el formateador de consola (con colores si colorlog está disponible).
     
-    Args:
-        name: Nombre del logger
-        level: Nivel de logging (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        log_to_file: Si se debe guardar a archivo
-        log_dir: Directorio para archivos de log
-        
     Returns:
-        Logger configurado
+        Formateador de consola
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
-    # Evitar duplicar handlers
-    if logger.handlers:
-        return logger
-    
-    # Formato de los mensajes
     if COLORLOG_AVAILABLE:
         # Formato con colores para consola
         console_format = (
             "%(log_color)s%(levelname)-8s%(reset)s "
             "%(cyan)s%(name)s%(reset)s - %(message)s"
         )
-        console_formatter = colorlog.ColoredFormatter(
+        return colorlog.ColoredFormatter(
             console_format,
             datefmt='%Y-%m-%d %H:%M:%S',
             log_colors={
@@ -54,15 +58,46 @@ def setup_logger(name: str = "PureVision", level: int = logging.INFO,
                 'CRITICAL': 'red,bg_white',
             }
         )
-    else:
-        # Formato sin colores
-        console_format = "%(levelname)-8s %(name)s - %(message)s"
-        console_formatter = logging.Formatter(console_format)
+    
+    # Formato sin colores
+    console_format = "%(levelname)-8s %(name)s - %(message)s"
+    return logging.Formatter(console_format)
+
+
+# Formateadores compartidos por todos los loggers (no guardan estado)
+_CONSOLE_FORMATTER = _build_console_formatter()
+_FILE_FORMATTER = logging.Formatter(
+    "%(asctime)s - %(levelname)-8s - %(name)s - %(message)s",
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+
+def setup_logger(name: str = "PureVision", level: int = logging.INFO,
+                log_to_file: bool = True, log_dir: str = "logs") -> logging.Logger:
+    """
+    Configura y retorna un logger para el proyecto.
+    
+    Args:
+        name: Nombre del logger
+        level: Nivel de logging (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        log_to_file: Si se debe guardar a archivo
+        log_dir: Directorio para archivos de log
+        
+    Returns:
+        Logger configurado
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    
+    # Evitar duplicar handlers
+    if logger.handlers:
+        _CONFIGURED.add(name)
+        return logger
     
     # Handler para consola
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
-    console_handler.setFormatter(console_formatter)
+    console_handler.setFormatter(_CONSOLE_FORMATTER)
     logger.addHandler(console_handler)
     
     # Handler para archivo
@@ -73,16 +108,24 @@ def setup_logger(name: str = "PureVision", level: int = logging.INFO,
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = log_path / f"{name}_{timestamp}.log"
         
-        file_format = "%(asctime)s - %(levelname)-8s - %(name)s - %(message)s"
-        file_formatter = logging.Formatter(file_format, datefmt='%Y-%m-%d %H:%M:%S')
-        
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
         file_handler.setLevel(level)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(_FILE_FORMATTER)
+        
+        # La escritura a disco se hace en un hilo aparte: quien registra
+        # (p. ej. el hilo de vídeo) sólo encola el mensaje
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setLevel(level)
+        logger.addHandler(queue_handler)
+        
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        _LISTENERS.append(listener)
         
         logger.info(f"Logging a archivo: {log_file}")
     
+    _CONFIGURED.add(name)
     return logger
 
 
@@ -96,12 +139,16 @@ def get_logger(name: str) -> logging.Logger:
     Returns:
         Logger
     """
+    if name in _CONFIGURED:
+        return logging.getLogger(name)
+    
     logger = logging.getLogger(name)
     
     # Si no tiene handlers, configurarlo
     if not logger.handlers:
         return setup_logger(name)
     
+    _CONFIGURED.add(name)
     return logger
 
 
@@ -2,11 +2,99 @@
 Visualizer - Herramientas de visualización en tiempo real.
 """
 
+import functools
+import math
+from array import array
 import cv2
 import numpy as np
 from typing import Optional, Dict, Any, List, Tuple
-import matplotlib.pyplot as plt
-from collections import deque
+
+try:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Paleta "tab10" de matplotlib en BGR para las series de plot_signals
+_PLOT_COLORS = (
+    (180, 119, 31), (14, 127, 255), (44, 160, 44), (40, 39, 214),
+    (189, 103, 148), (75, 86, 140), (194, 119, 227), (127, 127, 127),
+    (34, 189, 188), (207, 190, 23)
+)
+
+# Márgenes del área de trazado (izquierda, derecha, arriba, abajo) en px
+_PLOT_MARGINS = (60, 20, 30, 40)
+
+# Colores del indicador de FPS (BGR) por tramo: <15, 15-25 y >=25 FPS
+_FPS_COLORS = ((0, 0, 255), (0, 165, 255), (0, 255, 0))
+
+# Fuente de todos los textos del visualizador
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# Por debajo de este número de elementos (p. ej. 320x240x3) la rejilla de
+# 1 px se escribe con Numba: la llamada a OpenCV cuesta más que los píxeles
+_GRID_NUMBA_MAX_SIZE = 320 * 240 * 3
+
+
+if NUMBA_AVAILABLE:
+    # Funciones puras que solo escriben en su salida: liberan el GIL para
+    # que un hilo de render no bloquee al que añade puntos
+    @njit(cache=True, nogil=True)
+    def _sig_to_pix(vals, i0, x0, x_scale, y_base, lo, y_scale, out):
+        """Convierte una señal (muestras i0, i0+1, ...) a coordenadas de
+        píxel (N, 1, 2) en una pasada."""
+        for i in range(vals.shape[0]):
+            out[i, 0, 0] = int(x0 + (i0 + i) * x_scale)
+            out[i, 0, 1] = int(y_base - (vals[i] - lo) * y_scale)
+    @njit(cache=True, nogil=True)
+    def _grid_lines(img, ys, xs, color):
+        """Escribe directamente líneas horizontales (filas ys) y verticales
+        (columnas xs) de 1 px a lo ancho/alto de una imagen (H, W, C)."""
+        h, w, c = img.shape
+        for y in ys:
+            for x in range(w):
+                for k in range(c):
+                    img[y, x, k] = color[k]
+        for x in xs:
+            for y in range(h):
+                for k in range(c):
+                    img[y, x, k] = color[k]
+else:
+    def _sig_to_pix(vals, i0, x0, x_scale, y_base, lo, y_scale, out):
+        """Convierte una señal (muestras i0, i0+1, ...) a coordenadas de
+        píxel (N, 1, 2)."""
+        out[:, 0, 0] = x0 + np.arange(i0, i0 + vals.shape[0]) * x_scale
+        out[:, 0, 1] = y_base - (vals.astype(np.float64) - lo) * y_scale
+
+
+@functools.lru_cache(maxsize=1024)
+def _fps_label(tenths: int) -> Tuple[str, Tuple[int, int, int]]:
+    """
+    Texto y color del indicador de FPS para un valor en décimas.
+    
+    El color se decide sobre el valor mostrado, así texto y color siempre
+    concuerdan y ambos se reutilizan mientras el FPS visible no cambia.
+    """
+    fps = tenths / 10
+    return f"FPS: {fps:.1f}", _FPS_COLORS[(fps >= 15) + (fps >= 25)]
+
+
+@functools.lru_cache(maxsize=512)
+def _text_size(text: str, font: int, scale: float,
+               thickness: int) -> Tuple[Tuple[int, int], int]:
+    """
+    cv2.getTextSize con caché: las etiquetas (FPS, nombres, ROI) se repiten
+    frame a frame y sus métricas no cambian.
+    """
+    return cv2.getTextSize(text, font, scale, thickness)
 
 
 class Visualizer:
@@ -22,8 +110,28 @@ class Visualizer:
             window_name: Nombre de la ventana principal
         """
         self.window_name = window_name
-        self.signal_buffer = {}
         self.max_buffer_size = 300
+        # Señales en anillos float32 preasignados (array.array: escribir un
+        # escalar cuesta menos que en un ndarray y se leen con vistas NumPy
+        # sin copia); posición de escritura y número de muestras por señal
+        self._ring: Dict[str, array] = {}
+        self._widx: Dict[str, int] = {}
+        self._count: Dict[str, int] = {}
+        # Lienzo BGR reutilizado por plot_signals (se reserva por tamaño)
+        self._plot_canvas: Optional[np.ndarray] = None
+        # Figura de matplotlib reutilizada por el renderer "matplotlib":
+        # se recrea si cambia el tamaño y se rehace si cambian las series
+        self._fig = None
+        self._ax = None
+        self._canvas = None
+        self._lines: List[Any] = []
+        self._fig_key: Optional[Tuple] = None
+        self._bgr_out: Optional[np.ndarray] = None
+        # Último gráfico generado y sus argumentos: se reutiliza mientras no
+        # lleguen puntos nuevos (_dirty)
+        self._dirty = True
+        self._last_plot: Optional[np.ndarray] = None
+        self._last_plot_key: Optional[Tuple] = None
     
     @staticmethod
     def draw_text(frame: np.ndarray, text: str, position: Tuple[int, int],
@@ -44,28 +152,64 @@ class Visualizer:
         Returns:
             Frame con texto dibujado
         """
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        
-        # Calcular tamaño del texto
-        (text_width, text_height), baseline = cv2.getTextSize(
-            text, font, font_scale, thickness
-        )
-        
-        x, y = position
-        
-        # Dibujar fondo si se especifica
+        # Dibujar fondo si se especifica (requiere el tamaño del texto)
         if bg_color is not None:
-            padding = 5
+            (text_width, text_height), baseline = _text_size(
+                text, _FONT, font_scale, thickness
+            )
+            x, y = position
             cv2.rectangle(
                 frame,
-                (x - padding, y - text_height - padding),
-                (x + text_width + padding, y + baseline + padding),
+                (x - 5, y - text_height - 5),
+                (x + text_width + 5, y + baseline + 5),
                 bg_color,
                 -1
             )
         
         # Dibujar texto
-        cv2.putText(frame, text, (x, y), font, font_scale, color, thickness)
+        cv2.putText(frame, text, position, _FONT, font_scale, color, thickness)
+        
+        return frame
+    
+    @staticmethod
+    def draw_text_batch(frame: np.ndarray, items: List[Tuple[str, Tuple[int, int]]],
+                        font_scale: float = 0.6, color: Tuple[int, int, int] = (0, 255, 0),
+                        thickness: int = 2,
+                        bg_color: Optional[Tuple[int, int, int]] = None) -> np.ndarray:
+        """
+        Dibuja varios textos con el mismo estilo (p. ej. un HUD) de una vez.
+        
+        Las métricas salen de la caché de _text_size; primero se rellenan
+        todos los fondos y después se dibujan todos los textos, de modo que
+        un fondo nunca tapa el texto de una línea anterior.
+        
+        Args:
+            frame: Frame de entrada (se dibuja sobre él)
+            items: Lista de (texto, posición (x, y))
+            font_scale: Escala del texto
+            color: Color del texto (BGR)
+            thickness: Grosor del texto
+            bg_color: Color de fondo opcional
+            
+        Returns:
+            Frame con los textos dibujados
+        """
+        font = _FONT
+        put_text = cv2.putText
+        
+        if bg_color is not None:
+            rectangle = cv2.rectangle
+            padding = 5
+            for text, (x, y) in items:
+                (text_width, text_height), baseline = _text_size(
+                    text, font, font_scale, thickness
+                )
+                rectangle(frame, (x - padding, y - text_height - padding),
+                          (x + text_width + padding, y + baseline + padding),
+                          bg_color, -1)
+        
+        for text, position in items:
+            put_text(frame, text, position, font, font_scale, color, thickness)
         
         return frame
     
@@ -82,14 +226,18 @@ class Visualizer:
         Returns:
             Frame con FPS dibujado
         """
-        text = f"FPS: {fps:.1f}"
-        color = (0, 255, 0) if fps >= 25 else (0, 165, 255) if fps >= 15 else (0, 0, 255)
+        fps = float(fps)
+        if math.isfinite(fps):
+            text, color = _fps_label(round(fps * 10))
+        else:
+            # NaN/inf no se pueden redondear a décimas: se formatean tal cual
+            text, color = f"FPS: {fps:.1f}", _FPS_COLORS[(fps >= 15) + (fps >= 25)]
         return Visualizer.draw_text(frame, text, position, color=color, bg_color=(0, 0, 0))
     
     @staticmethod
     def draw_grid(frame: np.ndarray, rows: int = 3, cols: int = 3,
                  color: Tuple[int, int, int] = (100, 100, 100),
-                 thickness: int = 1) -> np.ndarray:
+                 thickness: int = 1, inplace: bool = False) -> np.ndarray:
         """
         Dibuja una rejilla en el frame.
         
@@ -99,29 +247,44 @@ class Visualizer:
             cols: Número de columnas
             color: Color de las líneas
             thickness: Grosor de las líneas
+            inplace: Dibujar sobre `frame` (se devuelve el mismo array) en
+                lugar de sobre una copia
             
         Returns:
             Frame con rejilla
         """
         h, w = frame.shape[:2]
-        result = frame.copy()
-        
-        # Líneas horizontales
-        for i in range(1, rows):
-            y = int(h * i / rows)
-            cv2.line(result, (0, y), (w, y), color, thickness)
-        
-        # Líneas verticales
-        for i in range(1, cols):
-            x = int(w * i / cols)
-            cv2.line(result, (x, 0), (x, h), color, thickness)
+        result = frame if inplace else frame.copy()
+        
+        ys = np.arange(1, max(rows, 1), dtype=np.int32) * h // rows
+        xs = np.arange(1, max(cols, 1), dtype=np.int32) * w // cols
+        
+        if (NUMBA_AVAILABLE and thickness == 1 and result.size <= _GRID_NUMBA_MAX_SIZE
+                and result.dtype == np.uint8 and result.ndim == 3 and result.shape[2] <= 4):
+            color_px = np.zeros(result.shape[2], dtype=np.uint8)
+            color_px[:min(len(color), len(color_px))] = color[:len(color_px)]
+            _grid_lines(result, ys, xs, color_px)
+            return result
+        
+        # Todas las líneas como segmentos de 2 puntos en un solo polylines
+        segments = np.empty((len(ys) + len(xs), 2, 2), dtype=np.int32)
+        segments[:len(ys), :, 1] = ys[:, None]
+        segments[:len(ys), 0, 0] = 0
+        segments[:len(ys), 1, 0] = w
+        segments[len(ys):, :, 0] = xs[:, None]
+        segments[len(ys):, 0, 1] = 0
+        segments[len(ys):, 1, 1] = h
+        
+        if len(segments):
+            cv2.polylines(result, list(segments), False, color, thickness)
         
         return result
     
     @staticmethod
     def draw_roi(frame: np.ndarray, roi: Tuple[int, int, int, int],
                 color: Tuple[int, int, int] = (0, 255, 0),
-                thickness: int = 2, label: Optional[str] = None) -> np.ndarray:
+                thickness: int = 2, label: Optional[str] = None,
+                inplace: bool = False) -> np.ndarray:
         """
         Dibuja una región de interés (ROI).
         
@@ -131,12 +294,14 @@ class Visualizer:
             color: Color del rectángulo
             thickness: Grosor de las líneas
             label: Etiqueta opcional
+            inplace: Dibujar sobre `frame` (se devuelve el mismo array) en
+                lugar de sobre una copia
             
         Returns:
             Frame con ROI dibujado
         """
         x, y, w, h = roi
-        result = frame.copy()
+        result = frame if inplace else frame.copy()
         
         cv2.rectangle(result, (x, y), (x + w, y + h), color, thickness)
         
@@ -153,54 +318,227 @@ class Visualizer:
             signal_name: Nombre de la señal
             value: Valor del punto
         """
-        if signal_name not in self.signal_buffer:
-            self.signal_buffer[signal_name] = deque(maxlen=self.max_buffer_size)
+        ring = self._ring.get(signal_name)
+        if ring is None:
+            ring = self._ring[signal_name] = array('f', bytes(4 * self.max_buffer_size))
+            self._widx[signal_name] = 0
+            self._count[signal_name] = 0
+        
+        widx = self._widx[signal_name]
+        ring[widx] = value
+        widx += 1
+        self._widx[signal_name] = 0 if widx == len(ring) else widx
+        if self._count[signal_name] < len(ring):
+            self._count[signal_name] += 1
+        self._dirty = True
+    
+    def _signal_views(self, signal_name: str) -> Tuple[np.ndarray, ...]:
+        """
+        Devuelve las muestras de una señal en orden cronológico, sin copiar.
         
-        self.signal_buffer[signal_name].append(value)
+        Args:
+            signal_name: Nombre de la señal
+            
+        Returns:
+            Una o dos vistas del anillo (la segunda si los datos dan la vuelta)
+        """
+        ring = np.frombuffer(self._ring[signal_name], dtype=np.float32)
+        count = self._count[signal_name]
+        if count < len(ring):
+            return (ring[:count],)
+        widx = self._widx[signal_name]
+        return (ring[widx:], ring[:widx])
+    
+    def get_signal(self, signal_name: str) -> np.ndarray:
+        """
+        Obtiene una copia ordenada de las muestras de una señal.
+        
+        Args:
+            signal_name: Nombre de la señal
+            
+        Returns:
+            Array float32 con las muestras (vacío si la señal no existe)
+        """
+        if signal_name not in self._ring:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate(self._signal_views(signal_name))
     
     def plot_signals(self, signals: Optional[List[str]] = None,
-                    title: str = "Signals", size: Tuple[int, int] = (800, 400)) -> np.ndarray:
+                    title: str = "Signals", size: Tuple[int, int] = (800, 400),
+                    renderer: str = "opencv") -> np.ndarray:
         """
         Genera una imagen con el gráfico de señales temporales.
         
+        Por defecto se dibuja directamente con OpenCV. Ambos renderers
+        escriben sobre un búfer reutilizado: la imagen devuelta se
+        sobrescribe en la siguiente llamada del mismo tamaño (copiarla si se
+        necesita conservar). Si no se ha añadido ningún punto desde la última
+        llamada con los mismos argumentos, se devuelve la imagen anterior
+        sin redibujar.
+        
         Args:
             signals: Lista de nombres de señales a graficar (None = todas)
             title: Título del gráfico
             size: Tamaño de la imagen (width, height)
+            renderer: "opencv" (rápido) o "matplotlib"
             
         Returns:
-            Imagen del gráfico
+            Imagen del gráfico (BGR)
         """
         if signals is None:
-            signals = list(self.signal_buffer.keys())
+            signals = list(self._ring.keys())
         
-        # Crear figura de matplotlib
-        fig, ax = plt.subplots(figsize=(size[0]/100, size[1]/100), dpi=100)
+        key = (tuple(signals), title, tuple(size), renderer)
+        if not self._dirty and key == self._last_plot_key:
+            return self._last_plot
         
-        for signal_name in signals:
-            if signal_name in self.signal_buffer:
-                data = list(self.signal_buffer[signal_name])
-                ax.plot(data, label=signal_name)
+        if renderer == "matplotlib":
+            if not MATPLOTLIB_AVAILABLE:
+                raise ImportError("matplotlib no está instalado; usar renderer='opencv'")
+            img = self._plot_signals_matplotlib(signals, title, size)
+        else:
+            img = self._plot_signals_opencv(signals, title, size)
         
-        ax.set_title(title)
-        ax.set_xlabel("Time")
-        ax.set_ylabel("Value")
-        ax.legend()
-        ax.grid(True, alpha=0.3)
+        self._dirty = False
+        self._last_plot_key = key
+        self._last_plot = img
+        return img
+    
+    def _plot_signals_opencv(self, signals: List[str], title: str,
+                             size: Tuple[int, int]) -> np.ndarray:
+        """
+        Genera el gráfico de señales dibujando directamente con OpenCV.
         
-        # Convertir a imagen numpy
-        fig.canvas.draw()
-        img = np.frombuffer(fig.canvas.tostring_rgb(), dtype=np.uint8)
-        img = img.reshape(fig.canvas.get_width_height()[::-1] + (3,))
+        Args:
+            signals: Nombres de señales a graficar
+            title: Título del gráfico
+            size: Tamaño de la imagen (width, height)
+            
+        Returns:
+            Imagen del gráfico (BGR)
+        """
+        width, height = size
+        canvas = self._plot_canvas
+        if canvas is None or canvas.shape[:2] != (height, width):
+            canvas = self._plot_canvas = np.empty((height, width, 3), dtype=np.uint8)
+        canvas.fill(255)
+        
+        left, right, top, bottom = _PLOT_MARGINS
+        x0, x1 = left, width - right
+        y0, y1 = top, height - bottom
+        font = _FONT
+        
+        # Vistas directas sobre los anillos (sin copiar ni reordenar)
+        series = [
+            (name, [view for view in self._signal_views(name) if len(view)])
+            for name in signals
+            if self._count.get(name, 0) > 0
+        ]
+        
+        # Escala común a todas las series (como los ejes de matplotlib)
+        if series:
+            lo = min(float(view.min()) for _, views in series for view in views)
+            hi = max(float(view.max()) for _, views in series for view in views)
+            n_max = max(self._count[name] for name, _ in series)
+        else:
+            lo, hi, n_max = 0.0, 1.0, 1
+        if hi <= lo:
+            lo, hi = lo - 0.5, hi + 0.5
+        
+        # Rejilla, ejes y etiquetas
+        grid_color = (220, 220, 220)
+        for k in range(1, 5):
+            gy = y0 + (y1 - y0) * k // 5
+            gx = x0 + (x1 - x0) * k // 5
+            cv2.line(canvas, (x0, gy), (x1, gy), grid_color, 1)
+            cv2.line(canvas, (gx, y0), (gx, y1), grid_color, 1)
+        cv2.rectangle(canvas, (x0, y0), (x1, y1), (0, 0, 0), 1)
+        
+        cv2.putText(canvas, title, (x0, top - 10), font, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+        cv2.putText(canvas, "Time", ((x0 + x1) // 2 - 15, height - 10), font, 0.4,
+                    (0, 0, 0), 1, cv2.LINE_AA)
+        cv2.putText(canvas, "Value", (5, top - 10), font, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
+        cv2.putText(canvas, f"{hi:.3g}", (5, y0 + 12), font, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
+        cv2.putText(canvas, f"{lo:.3g}", (5, y1), font, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
+        cv2.putText(canvas, "0", (x0, y1 + 15), font, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
+        cv2.putText(canvas, str(n_max - 1), (x1 - 25, y1 + 15), font, 0.4,
+                    (0, 0, 0), 1, cv2.LINE_AA)
+        
+        # Series: una transformación (Numba si está) y un polylines por señal
+        x_scale = (x1 - x0) / max(n_max - 1, 1)
+        y_scale = (y1 - y0) / (hi - lo)
+        for k, (name, views) in enumerate(series):
+            color = _PLOT_COLORS[k % len(_PLOT_COLORS)]
+            pts = np.empty((self._count[name], 1, 2), dtype=np.int32)
+            start = 0
+            for view in views:
+                _sig_to_pix(view, start, float(x0), x_scale, float(y1), lo, y_scale,
+                            pts[start:start + len(view)])
+                start += len(view)
+            cv2.polylines(canvas, [pts], False, color, 1, cv2.LINE_AA)
+            
+            # Leyenda (esquina superior derecha)
+            ly = y0 + 15 + 15 * k
+            cv2.line(canvas, (x1 - 110, ly - 4), (x1 - 90, ly - 4), color, 2)
+            cv2.putText(canvas, name, (x1 - 85, ly), font, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
         
-        plt.close(fig)
+        return canvas
+    
+    def _plot_signals_matplotlib(self, signals: List[str], title: str,
+                                 size: Tuple[int, int]) -> np.ndarray:
+        """
+        Genera el gráfico de señales con matplotlib (renderizado más lento).
         
-        # Convertir RGB a BGR para OpenCV
-        return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        Args:
+            signals: Nombres de señales a graficar
+            title: Título del gráfico
+            size: Tamaño de la imagen (width, height)
+            
+        Returns:
+            Imagen del gráfico (BGR)
+        """
+        names = tuple(name for name in signals if name in self._ring)
+        key = (tuple(size), names, title)
+        
+        if self._fig is not None and self._fig_key == key:
+            # Misma figura y mismas series: solo se actualizan los datos
+            for line, name in zip(self._lines, names):
+                data = self.get_signal(name)
+                line.set_data(np.arange(len(data)), data)
+            self._ax.relim()
+            self._ax.autoscale_view()
+        else:
+            # Figura reutilizada entre llamadas (se recrea si cambia el tamaño)
+            if self._fig is None or self._fig_key[0] != key[0]:
+                self._fig = Figure(figsize=(size[0]/100, size[1]/100), dpi=100)
+                self._canvas = FigureCanvasAgg(self._fig)
+                self._ax = self._fig.add_subplot()
+            ax = self._ax
+            ax.clear()
+            
+            self._lines = [ax.plot(self.get_signal(name), label=name)[0] for name in names]
+            
+            ax.set_title(title)
+            ax.set_xlabel("Time")
+            ax.set_ylabel("Value")
+            ax.legend()
+            ax.grid(True, alpha=0.3)
+            self._fig_key = key
+        
+        # Leer el búfer RGBA de Agg sin copiarlo y convertirlo a BGR en
+        # una sola pasada sobre un búfer reutilizado
+        self._canvas.draw()
+        rgba = np.asarray(self._canvas.buffer_rgba())
+        out = self._bgr_out
+        if out is None or out.shape[:2] != rgba.shape[:2]:
+            out = self._bgr_out = np.empty(rgba.shape[:2] + (3,), dtype=np.uint8)
+        cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR, dst=out)
+        return out
     
     @staticmethod
     def create_side_by_side(frame1: np.ndarray, frame2: np.ndarray,
-                           labels: Optional[Tuple[str, str]] = None) -> np.ndarray:
+                           labels: Optional[Tuple[str, str]] = None,
+                           out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Crea una visualización lado a lado de dos frames.
         
@@ -208,6 +546,8 @@ class Visualizer:
             frame1: Primer frame
             frame2: Segundo frame
             labels: Etiquetas opcionales (label1, label2)
+            out: Buffer de salida reutilizable (p. ej. el resultado de la
+                llamada anterior); si su forma no encaja se reserva otro
             
         Returns:
             Imagen combinada
@@ -223,28 +563,37 @@ class Visualizer:
         if h2 != target_h:
             frame2 = cv2.resize(frame2, (int(w2 * target_h / h2), target_h))
         
-        # Añadir etiquetas si se proporcionan
-        if labels:
-            frame1 = Visualizer.draw_text(
-                frame1, labels[0], (10, 30),
-                font_scale=1.0, color=(255, 255, 255), bg_color=(0, 0, 0)
-            )
-            frame2 = Visualizer.draw_text(
-                frame2, labels[1], (10, 30),
-                font_scale=1.0, color=(255, 255, 255), bg_color=(0, 0, 0)
-            )
+        # Concatenar horizontalmente copiando cada frame en su mitad
+        w1 = frame1.shape[1]
+        shape = (frame1.shape[0], w1 + frame2.shape[1]) + frame1.shape[2:]
+        if out is None or out.shape != shape or out.dtype != frame1.dtype:
+            out = np.empty(shape, dtype=frame1.dtype)
+        out[:, :w1] = frame1
+        out[:, w1:] = frame2
         
-        # Concatenar horizontalmente
-        return np.hstack([frame1, frame2])
+        # Etiquetas sobre cada mitad del resultado (sin tocar los frames de
+        # entrada y recortadas a su mitad como antes)
+        if labels:
+            for half, label in ((out[:, :w1], labels[0]), (out[:, w1:], labels[1])):
+                Visualizer.draw_text(
+                    half, label, (10, 30),
+                    font_scale=1.0, color=(255, 255, 255), bg_color=(0, 0, 0)
+                )
+        return out
     
     @staticmethod
-    def create_mosaic(frames: List[np.ndarray], grid_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    def create_mosaic(frames: List[np.ndarray], grid_size: Optional[Tuple[int, int]] = None,
+                      interpolation: Optional[int] = None) -> np.ndarray:
         """
         Crea un mosaico de múltiples frames.
         
         Args:
             frames: Lista de frames
             grid_size: Tamaño de la rejilla (rows, cols). None = automático
+            interpolation: Interpolación de cv2.resize. None = INTER_AREA al
+                reducir (mejor calidad, sin aliasing) e INTER_LINEAR al
+                ampliar; cv2.INTER_NEAREST es la más rápida y suele bastar
+                para mosaicos de monitorización
             
         Returns:
             Mosaico de frames
@@ -255,28 +604,46 @@ class Visualizer:
         
         # Determinar tamaño de rejilla
         if grid_size is None:
-            cols = int(np.ceil(np.sqrt(n_frames)))
-            rows = int(np.ceil(n_frames / cols))
+            # ceil(sqrt(n)) y ceil(n / cols) en aritmética entera
+            cols = math.isqrt(n_frames - 1) + 1
+            rows = -(-n_frames // cols)
         else:
             rows, cols = grid_size
         
-        # Redimensionar frames al mismo tamaño
+        # Redimensionar frames al mismo tamaño, directamente sobre su
+        # casilla del mosaico (sin arrays intermedios ni hstack/vstack)
         target_h = frames[0].shape[0] // rows
         target_w = frames[0].shape[1] // cols
         
-        resized_frames = []
-        for frame in frames:
-            resized = cv2.resize(frame, (target_w, target_h))
-            resized_frames.append(resized)
-        
-        # Rellenar con frames negros si es necesario
-        while len(resized_frames) < rows * cols:
-            resized_frames.append(np.zeros((target_h, target_w, 3), dtype=np.uint8))
-        
-        # Crear mosaico
-        mosaic_rows = []
-        for i in range(rows):
-            row_frames = resized_frames[i*cols:(i+1)*cols]
-            mosaic_rows.append(np.hstack(row_frames))
-        
-        return np.vstack(mosaic_rows)
+        # Mismos canales y tipo que el primer frame (gris, BGR, BGRA, float...)
+        mosaic = np.empty((rows * target_h, cols * target_w) + frames[0].shape[2:],
+                          dtype=frames[0].dtype)
+        
+        n_tiles = min(n_frames, rows * cols)
+        for idx in range(n_tiles):
+            i, j = divmod(idx, cols)
+            tile = mosaic[i*target_h:(i+1)*target_h, j*target_w:(j+1)*target_w]
+            frame = frames[idx]
+            interp = interpolation
+            if interp is None:
+                shrinking = target_w < frame.shape[1] and target_h < frame.shape[0]
+                interp = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+            if frame.dtype == tile.dtype and frame.shape[2:] == tile.shape[2:]:
+                cv2.resize(frame, (target_w, target_h), dst=tile, interpolation=interp)
+            else:
+                # Canales o tipo distintos: cv2 no escribiría en la casilla;
+                # se copia convirtiendo (un frame gris se repite por canal)
+                resized = cv2.resize(frame, (target_w, target_h), interpolation=interp)
+                if resized.ndim < tile.ndim:
+                    resized = resized[..., None]
+                tile[...] = resized
+        
+        # Casillas sobrantes en negro: resto de la última fila ocupada y
+        # filas vacías debajo, en dos rellenos como mucho
+        i, j = divmod(n_tiles, cols)
+        if j:
+            mosaic[i*target_h:(i+1)*target_h, j*target_w:].fill(0)
+            i += 1
+        mosaic[i*target_h:].fill(0)
+        
+        return mosaic